@@ -88,7 +88,11 @@ if not MCP_CONTAINER_NAME:
     raise ValueError("MCP_CONTAINER_NAME not found in environment variables.")
 
 DOCKER_COMMAND_TIMEOUT = int(os.getenv("DOCKER_COMMAND_TIMEOUT", "30"))
+# Upper bound on 'docker mcp' processes running at once for async callers
+MCP_MAX_CONCURRENT_COMMANDS = int(os.getenv("MCP_MAX_CONCURRENT_COMMANDS", "8"))
 DOCKER_HEALTH_CHECK_TIMEOUT = int(os.getenv("DOCKER_HEALTH_CHECK_TIMEOUT", "5"))
+# Seconds a 'docker ps' health result is reused (0 disables caching)
+DOCKER_HEALTH_CACHE_TTL = float(os.getenv("DOCKER_HEALTH_CACHE_TTL", "5"))
 
 
 # ============================================================
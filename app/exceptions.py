@@ -33,20 +33,24 @@ class DockerConnectionError(DockerError):
 class DockerCommandError(DockerError):
     """Raised when Docker command execution fails."""
 
+    _TEMPLATE = "Command '{command}' failed: {error}"
+
     def __init__(self, command: str, error: str, returncode: int = None):
         self.command = command
         self.error = error
         self.returncode = returncode
-        super().__init__(f"Command '{command}' failed: {error}")
+        super().__init__(self._TEMPLATE.format(command=command, error=error))
 
 
 class DockerTimeoutError(DockerError):
     """Raised when Docker command times out."""
 
+    _TEMPLATE = "Command '{command}' timed out after {timeout}s"
+
     def __init__(self, command: str, timeout: int):
         self.command = command
         self.timeout = timeout
-        super().__init__(f"Command '{command}' timed out after {timeout}s")
+        super().__init__(self._TEMPLATE.format(command=command, timeout=timeout))
 
 
 class LLMError(MCPAssistantError):
@@ -64,11 +68,11 @@ class LLMConfigurationError(LLMError):
 class LLMRateLimitError(LLMError):
     """Raised when all LLM models hit rate limits."""
 
+    _TEMPLATE = "Rate limit exceeded for all models: {models}"
+
     def __init__(self, models_tried: list):
         self.models_tried = models_tried
-        super().__init__(
-            f"Rate limit exceeded for all models: {', '.join(models_tried)}"
-        )
+        super().__init__(self._TEMPLATE.format(models=", ".join(models_tried)))
 
 
 class LLMResponseError(LLMError):
@@ -86,10 +90,11 @@ class APIError(MCPAssistantError):
 class ServiceUnavailableError(APIError):
     """Raised when a required service is unavailable."""
 
+    _TEMPLATE = "Service '{service}' is unavailable"
+    _TEMPLATE_WITH_REASON = "Service '{service}' is unavailable: {reason}"
+
     def __init__(self, service: str, reason: str = None):
         self.service = service
         self.reason = reason
-        message = f"Service '{service}' is unavailable"
-        if reason:
-            message += f": {reason}"
-        super().__init__(message)
+        template = self._TEMPLATE_WITH_REASON if reason else self._TEMPLATE
+        super().__init__(template.format(service=service, reason=reason))
@@ -12,12 +12,32 @@ Features:
 - Request logging and metrics
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import (
+    Depends,
+    FastAPI,
+    HTTPException,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.middleware.gzip import GZipMiddleware
+from functools import partial
+from pydantic import ValidationError
+from typing import Any, Callable, Dict, List
+from uuid import uuid4
+import asyncio
+import json
 import time
 
+try:  # C-accelerated JSON when available; stdlib json is the fallback
+    import orjson  # noqa: F401 - ORJSONResponse imports it itself
+
+    _HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    _HAS_ORJSON = False
+
 from app.schemas import ChatRequest, ChatResponse, HealthCheckResponse
 from app.config import (
     API_TITLE,
@@ -28,12 +48,15 @@ from app.config import (
     ENVIRONMENT,
     CORS_ORIGINS,
     GEMINI_MODEL_PRIMARY,
+    MAX_CONVERSATION_HISTORY,
     verify_config,
     get_config_summary,
     get_active_features,
 )
-from app.services.llm_service import get_llm_service
-from app.services.docker_service import get_docker_service
+from app.exceptions import LLMConfigurationError
+from app.services.llm_service import LanguageModelService, get_llm_service
+from app.services.docker_service import DockerService, get_docker_service
+from app.services.conversation_store import get_conversation_store
 from app.logger import setup_logger
 
 # Setup logger
@@ -47,6 +70,8 @@ app = FastAPI(
     version=API_VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    # Route responses (e.g. /chat replies) are encoded with orjson if installed
+    default_response_class=ORJSONResponse if _HAS_ORJSON else JSONResponse,
     openapi_tags=[
         {
             "name": "System",
@@ -90,6 +115,20 @@ async def add_process_time_header(request: Request, call_next):
 # Track request metrics
 request_metrics = {"total_requests": 0, "total_errors": 0, "total_chat_requests": 0}
 
+# Headers for Server-Sent Events: an explicit identity encoding makes
+# GZipMiddleware pass the stream through instead of buffering it, and the
+# no-cache / no-buffering hints keep proxies from holding frames back.
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Content-Encoding": "identity",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _sse(payload: Dict[str, Any]) -> str:
+    """Formats a payload as a single Server-Sent Events data frame."""
+    return f"data: {json.dumps(payload)}\n\n"
+
 
 # Initialize services on startup
 @app.on_event("startup")
@@ -178,6 +217,34 @@ async def shutdown_event():
     print("\n👋 Shutting down gracefully...")
 
 
+def get_llm_provider() -> Callable[[], LanguageModelService]:
+    """
+    Dependency that hands routes the LLM service factory, not the service.
+
+    FastAPI resolves dependencies before it reports body validation errors,
+    so depending on get_llm_service directly would build the service (and
+    fail on a missing API key) even for malformed requests. Routes call the
+    provider once the request body has been validated.
+    """
+    return get_llm_service
+
+
+def _resolve_history(request: ChatRequest) -> List[Dict[str, Any]]:
+    """Returns server-side history for session requests, else the client's copy."""
+    if request.session_id:
+        return get_conversation_store().get_history(request.session_id)
+    # Same bound the store applies, so a long client transcript can't grow the prompt
+    return request.history[-MAX_CONVERSATION_HISTORY:]
+
+
+def _remember_turn(request: ChatRequest, reply: str) -> None:
+    """Records a completed exchange for session requests."""
+    if request.session_id:
+        store = get_conversation_store()
+        store.append(request.session_id, "user", request.prompt)
+        store.append(request.session_id, "assistant", reply)
+
+
 @app.get("/", tags=["System"])
 async def root():
     """
@@ -198,13 +265,12 @@ async def root():
 
 
 @app.get("/config", tags=["System"])
-async def get_configuration():
+async def get_configuration(config_status: Dict[str, Any] = Depends(verify_config)):
     """
     Returns current configuration summary (sensitive data excluded).
     """
     request_metrics["total_requests"] += 1
     config_summary = get_config_summary()
-    config_status = verify_config()
 
     return {
         "configuration": config_summary,
@@ -214,7 +280,10 @@ async def get_configuration():
 
 
 @app.get("/metrics", tags=["Metrics"])
-async def get_metrics():
+async def get_metrics(
+    docker_service: DockerService = Depends(get_docker_service),
+    config_status: Dict[str, Any] = Depends(verify_config),
+):
     """
     Returns application metrics and statistics.
     """
@@ -235,14 +304,17 @@ async def get_metrics():
             "error_rate_percent": round(error_rate, 2),
         },
         "services": {
-            "docker": get_docker_service().is_healthy(),
-            "llm": verify_config()["google_api_configured"],
+            "docker": docker_service.is_healthy(),
+            "llm": config_status["google_api_configured"],
         },
     }
 
 
 @app.get("/health", response_model=HealthCheckResponse, tags=["System"])
-async def health_check():
+async def health_check(
+    docker_service: DockerService = Depends(get_docker_service),
+    config_status: Dict[str, Any] = Depends(verify_config),
+):
     """
     Health check endpoint with detailed system status.
 
@@ -251,8 +323,6 @@ async def health_check():
     """
     request_metrics["total_requests"] += 1
 
-    docker_service = get_docker_service()
-
     # Check Docker connection
     docker_connected = docker_service.is_healthy()
 
@@ -262,7 +332,6 @@ async def health_check():
     container_status = info.get("status", "disconnected")
 
     # Check LLM configuration
-    config_status = verify_config()
     llm_configured = config_status["google_api_configured"]
 
     # Determine overall status
@@ -286,18 +355,26 @@ async def health_check():
 
 
 @app.post("/chat", response_model=ChatResponse, tags=["Chat"])
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(
+    request: ChatRequest,
+    llm_provider: Callable[[], LanguageModelService] = Depends(get_llm_provider),
+    docker_service: DockerService = Depends(get_docker_service),
+):
     """
     Main chat endpoint with enhanced error handling and logging.
 
     Receives a user prompt and conversation history, processes it through
     the LLM with tool-use capabilities, and returns the assistant's response.
+    A request with neither history nor a session id starts a new server-side
+    session, whose id is returned for the client to send on later turns.
 
     The LLM can autonomously decide to execute Docker commands or call Notion API
     if needed to answer the user's question.
 
     Args:
         request: ChatRequest containing prompt and history
+        llm_provider: Returns the LLM service (a FastAPI dependency)
+        docker_service: The Docker service (a FastAPI dependency)
 
     Returns:
         ChatResponse with the assistant's reply
@@ -310,8 +387,7 @@ async def chat_endpoint(request: ChatRequest):
 
     try:
         # Validate that services are available
-        llm_service = get_llm_service()
-        docker_service = get_docker_service()
+        llm_service = llm_provider()
 
         if not docker_service.is_healthy():
             request_metrics["total_errors"] += 1
@@ -325,13 +401,19 @@ async def chat_endpoint(request: ChatRequest):
                 ),
             )
 
+        if not request.session_id and not request.history:
+            # First turn of a new conversation: open a server-side session so
+            # follow-up turns only need to send the prompt and this id back
+            request.session_id = uuid4().hex
+        history = _resolve_history(request)
+
         # Log the incoming request
         logger.info("=" * 60)
         logger.info("📨 New chat request")
         logger.info(
             f"Prompt: {request.prompt[:100]}{'...' if len(request.prompt) > 100 else ''}"
         )
-        logger.info(f"History length: {len(request.history)} messages")
+        logger.info(f"History length: {len(history)} messages")
 
         print(f"\n{'=' * 60}")
         print("📨 New chat request")
@@ -339,23 +421,30 @@ async def chat_endpoint(request: ChatRequest):
         print(
             f"Prompt: {request.prompt[:100]}{'...' if len(request.prompt) > 100 else ''}"
         )
-        print(f"History length: {len(request.history)} messages")
+        print(f"History length: {len(history)} messages")
 
         # Generate response using the agentic LLM
         start_time = time.time()
+        usage: Dict[str, int] = {}
         reply = await llm_service.get_response(
-            prompt=request.prompt, history=request.history
+            prompt=request.prompt, history=history, usage=usage
         )
         elapsed_time = time.time() - start_time
+        _remember_turn(request, reply)
 
         logger.info(f"✓ Response generated successfully in {elapsed_time:.2f}s")
         print(f"\n✓ Response generated successfully in {elapsed_time:.2f}s")
         print(f"{'=' * 60}\n")
 
-        return ChatResponse(reply=reply)
+        return ChatResponse(
+            reply=reply,
+            session_id=request.session_id,
+            tokens=usage.get("output_tokens"),
+            elapsed_ms=int(elapsed_time * 1000),
+        )
 
-    except HTTPException:
-        # Re-raise HTTP exceptions
+    except (HTTPException, LLMConfigurationError):
+        # Re-raise HTTP exceptions; configuration errors have their own handler
         raise
 
     except ValueError as e:
@@ -380,6 +469,214 @@ async def chat_endpoint(request: ChatRequest):
         )
 
 
+@app.post("/chat/stream", tags=["Chat"])
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    llm_provider: Callable[[], LanguageModelService] = Depends(get_llm_provider),
+    docker_service: DockerService = Depends(get_docker_service),
+):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+
+    Emits a "status" frame as soon as the request is accepted, "delta" frames
+    carrying reply text as the model produces it, and a final "done" frame. Failures after the stream
+    has started are reported as an "error" frame, since the HTTP status has
+    already been sent.
+
+    Args:
+        request: ChatRequest containing prompt and history
+        llm_provider: Returns the LLM service (a FastAPI dependency)
+        docker_service: The Docker service (a FastAPI dependency)
+
+    Returns:
+        StreamingResponse with media type text/event-stream
+
+    Raises:
+        HTTPException: If services are not available before streaming starts
+    """
+    request_metrics["total_requests"] += 1
+    request_metrics["total_chat_requests"] += 1
+
+    # Built before streaming starts, so a configuration error is still a 500
+    llm_service = llm_provider()
+
+    if not docker_service.is_healthy():
+        request_metrics["total_errors"] += 1
+        logger.warning("Chat stream request failed: Docker service not available")
+        raise HTTPException(
+            status_code=503,
+            detail=(
+                "Docker service is not available. "
+                "Please ensure Docker Desktop is running and the "
+                "MCP container is started."
+            ),
+        )
+
+    history = _resolve_history(request)
+    logger.info(f"📨 New chat stream request ({len(history)} history messages)")
+
+    async def event_stream():
+        yield _sse({"type": "status", "text": "Thinking..."})
+        start_time = time.time()
+        chunks: List[str] = []
+        try:
+            async for text in llm_service.stream_response(
+                prompt=request.prompt, history=history
+            ):
+                chunks.append(text)
+                yield _sse({"type": "delta", "text": text})
+        except Exception as e:
+            request_metrics["total_errors"] += 1
+            logger.error(f"Error in chat stream: {str(e)}", exc_info=True)
+            yield _sse({"type": "error", "text": f"Error processing request: {e}"})
+            return
+
+        logger.info(f"✓ Streamed response in {time.time() - start_time:.2f}s")
+        _remember_turn(request, "".join(chunks))
+        yield _sse({"type": "done"})
+
+    return StreamingResponse(
+        event_stream(), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+async def _ws_turn(
+    websocket: WebSocket,
+    request: ChatRequest,
+    turn_id: str,
+    llm_provider: Callable[[], LanguageModelService],
+    docker_service: DockerService,
+) -> None:
+    """Runs one WebSocket chat turn, sending the same frames as /chat/stream."""
+    request_metrics["total_requests"] += 1
+    request_metrics["total_chat_requests"] += 1
+
+    if not docker_service.is_healthy():
+        request_metrics["total_errors"] += 1
+        logger.warning("Chat websocket turn failed: Docker service not available")
+        await websocket.send_json(
+            {
+                "type": "error",
+                "turn_id": turn_id,
+                "text": "Docker service is not available.",
+            }
+        )
+        return
+
+    history = _resolve_history(request)
+    await websocket.send_json(
+        {"type": "status", "turn_id": turn_id, "text": "Thinking..."}
+    )
+    start_time = time.time()
+    try:
+        llm_service = llm_provider()
+        reply = await llm_service.get_response(prompt=request.prompt, history=history)
+    except Exception as e:
+        request_metrics["total_errors"] += 1
+        logger.error(f"Error in chat websocket turn: {str(e)}", exc_info=True)
+        await websocket.send_json(
+            {
+                "type": "error",
+                "turn_id": turn_id,
+                "text": f"Error processing request: {e}",
+            }
+        )
+        return
+
+    logger.info(f"✓ WebSocket response in {time.time() - start_time:.2f}s")
+    _remember_turn(request, reply)
+    await websocket.send_json({"type": "delta", "turn_id": turn_id, "text": reply})
+    await websocket.send_json({"type": "done", "turn_id": turn_id})
+
+
+def _forget_turn(
+    turns: Dict[str, asyncio.Task], turn_id: str, _task: asyncio.Task
+) -> None:
+    """Done-callback dropping a finished WebSocket turn from the live turns."""
+    turns.pop(turn_id, None)
+
+
+@app.websocket("/ws/chat")
+async def chat_websocket(
+    websocket: WebSocket,
+    llm_provider: Callable[[], LanguageModelService] = Depends(get_llm_provider),
+    docker_service: DockerService = Depends(get_docker_service),
+):
+    """
+    Persistent chat connection with mid-turn cancellation.
+
+    Clients send ChatRequest-shaped JSON messages, optionally tagged with a
+    "turn_id", and receive the /chat/stream frame types tagged with that id.
+    Sending {"cancel": turn_id} stops waiting on that turn and answers with
+    a "cancelled" frame. Turns still running on disconnect are cancelled.
+    """
+    await websocket.accept()
+    turns: Dict[str, asyncio.Task] = {}
+
+    try:
+        while True:
+            # Parsed here rather than with receive_json so one bad frame gets
+            # an error reply instead of closing the socket and its turns
+            try:
+                message = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError as e:
+                message = None
+                error = f"Invalid JSON: {e}"
+            else:
+                error = "Expected a JSON object"
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "text": error})
+                continue
+
+            if "cancel" in message:
+                if not isinstance(message["cancel"], str):
+                    await websocket.send_json(
+                        {"type": "error", "text": "cancel must be a turn_id string"}
+                    )
+                    continue
+                task = turns.pop(message["cancel"], None)
+                if task is not None:
+                    task.cancel()
+                    await websocket.send_json(
+                        {"type": "cancelled", "turn_id": message["cancel"]}
+                    )
+                continue
+
+            turn_id = str(message.pop("turn_id", None) or uuid4().hex)
+            try:
+                request = ChatRequest(**message)
+            except ValidationError as e:
+                await websocket.send_json(
+                    {"type": "error", "turn_id": turn_id, "text": str(e)}
+                )
+                continue
+
+            task = asyncio.create_task(
+                _ws_turn(websocket, request, turn_id, llm_provider, docker_service)
+            )
+            task.add_done_callback(partial(_forget_turn, turns, turn_id))
+            turns[turn_id] = task
+
+    except WebSocketDisconnect:
+        logger.info("Chat websocket disconnected")
+    finally:
+        for task in turns.values():
+            task.cancel()
+
+
+@app.exception_handler(LLMConfigurationError)
+async def llm_configuration_exception_handler(request, exc):
+    """
+    Reports a missing or invalid LLM configuration, e.g. when a route's LLM
+    provider cannot create the service.
+    """
+    request_metrics["total_errors"] += 1
+    logger.error(f"Configuration error: {exc}")
+    return JSONResponse(
+        status_code=500, content={"detail": f"Configuration error: {exc}"}
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """
@@ -37,6 +37,11 @@ class ChatRequest(BaseModel):
     history: List[Dict[str, Any]] = Field(
         default_factory=list, description="Previous messages in the conversation"
     )
+    session_id: Optional[str] = Field(
+        None,
+        description="Server-side conversation id; when set, history is ignored",
+        max_length=64,
+    )
 
     class Config:
         json_schema_extra = {
@@ -57,10 +62,25 @@ class ChatResponse(BaseModel):
     """
 
     reply: str = Field(..., description="The assistant's response message")
+    session_id: Optional[str] = Field(
+        None,
+        description="Session to send on the next turn (echoed, or newly assigned)",
+    )
+    tokens: Optional[int] = Field(
+        None, description="Tokens in the reply, as reported by the model API"
+    )
+    elapsed_ms: Optional[int] = Field(
+        None, description="Server-side time spent generating the reply"
+    )
 
     class Config:
         json_schema_extra = {
-            "example": {"reply": "There are 3 containers currently running..."}
+            "example": {
+                "reply": "There are 3 containers currently running...",
+                "session_id": "3f2b9c1e8a7d4e6f9b0c1d2e3f4a5b6c",
+                "tokens": 12,
+                "elapsed_ms": 1840,
+            }
         }
 
 
@@ -4,4 +4,5 @@ Service Layer
 Contains business logic for interacting with external services:
 - LLM Service: Manages Gemini API communication
 - Docker Service: Handles Docker container orchestration
+- Conversation Store: Keeps per-session chat history server-side
 """
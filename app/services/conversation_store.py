@@ -0,0 +1,96 @@
+"""
+Conversation Store
+
+Keeps chat history on the server, keyed by a client-chosen session id,
+so clients only need to send the new prompt on each turn.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from app.config import MAX_CONVERSATION_HISTORY
+
+
+class ConversationStore:
+    """
+    Bounded in-memory history store.
+
+    Each session keeps at most ``max_messages`` recent messages, and the
+    least recently used sessions are evicted beyond ``max_sessions``, so
+    memory stays bounded however long the process runs.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = MAX_CONVERSATION_HISTORY,
+        max_sessions: int = 256,
+    ):
+        """
+        Initializes an empty store.
+
+        Args:
+            max_messages: Messages retained per session (oldest dropped first)
+            max_sessions: Sessions retained before the least recent is evicted
+        """
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Deque[Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Returns a copy of the stored history for a session.
+
+        Args:
+            session_id: The client's session identifier
+
+        Returns:
+            Messages in API format (role, content), oldest first
+        """
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            return list(history)
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """
+        Appends one message to a session, creating the session if needed.
+
+        Args:
+            session_id: The client's session identifier
+            role: Either 'user' or 'assistant'
+            content: The message content
+        """
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = deque(maxlen=self.max_messages)
+                self._sessions[session_id] = history
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            history.append({"role": role, "content": content})
+
+    def clear(self, session_id: str) -> None:
+        """Forgets a session's history."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+# Singleton instance shared by all requests in this process.
+_conversation_store_instance: Optional[ConversationStore] = None
+
+
+def get_conversation_store() -> ConversationStore:
+    """
+    Factory function to get the singleton instance of ConversationStore.
+    """
+    global _conversation_store_instance
+
+    if _conversation_store_instance is None:
+        _conversation_store_instance = ConversationStore()
+
+    return _conversation_store_instance
@@ -5,24 +5,86 @@ Handles all interactions with the Docker MCP Gateway.
 Provides methods for server discovery, health checks, and command execution.
 """
 
+import shlex
 import subprocess
-from typing import Optional, Dict, Any
+import time
+from functools import lru_cache, partial
+from typing import Optional, Dict, Any, Tuple
+
+import anyio
+import docker  # type: ignore[import-untyped]  # The SDK ships no type hints
+from docker.errors import DockerException, NotFound  # type: ignore[import-untyped]
+
+from app.config import (
+    DOCKER_COMMAND_TIMEOUT,
+    DOCKER_HEALTH_CACHE_TTL,
+    DOCKER_HEALTH_CHECK_TIMEOUT,
+    MCP_MAX_CONCURRENT_COMMANDS,
+)
+from app.exceptions import DockerCommandError, DockerTimeoutError
+
+# Shared by all async callers so a burst of tool calls can't start an
+# unbounded number of worker threads, each forking a 'docker' process.
+_mcp_limiter = anyio.CapacityLimiter(MCP_MAX_CONCURRENT_COMMANDS)
+
+
+@lru_cache(maxsize=128)
+def _split_command(command: str) -> Tuple[str, ...]:
+    """
+    Tokenizes an MCP command string, shell-style.
+
+    Cached because the LLM tends to repeat the same few commands; quoted
+    arguments (e.g. search terms with spaces) stay single tokens.
+    """
+    return tuple(shlex.split(command))
 
 
 class DockerService:
     """
     Service class for managing Docker MCP Gateway interactions.
 
-    This class executes MCP commands through the Docker CLI since
-    MCP Gateway runs as a process, not a container.
+    Daemon operations (health, containers, logs) go through the Docker SDK,
+    which talks to the daemon socket directly instead of starting a 'docker'
+    CLI process per call. MCP commands still use the Docker CLI since
+    'docker mcp' is a CLI plugin and the gateway runs as a process, not a
+    container.
     """
 
+    # (monotonic timestamp, result) of the last daemon probe. A class
+    # default so instances built without __init__ start uncached.
+    _health_cache: Optional[Tuple[float, bool]] = None
+
     def __init__(self):
         """
         Initializes the Docker service.
         The connection_error attribute is used to cache connection issues.
         """
         self.connection_error: Optional[str] = None
+        try:
+            # from_env only reads configuration; no request is made until use
+            self.client = docker.from_env(timeout=DOCKER_HEALTH_CHECK_TIMEOUT)
+        except DockerException as e:
+            self.client = None
+            self.connection_error = str(e)
+
+    @classmethod
+    def for_testing(cls, client: Any = None) -> "DockerService":
+        """
+        Builds a service without running any startup checks.
+
+        Lets tests construct an instance in one call with a stand-in Docker
+        client, instead of bypassing __init__ and patching attributes in.
+
+        Args:
+            client: Object to expose as the service's Docker client
+
+        Returns:
+            A DockerService ready for use with mocked subprocess calls
+        """
+        service = cls.__new__(cls)
+        service.connection_error = None
+        service.client = client
+        return service
 
     def _check_mcp_gateway(self):
         """
@@ -56,16 +118,28 @@ class DockerService:
         """
         Checks if the Docker daemon is running and responsive.
 
+        The result is reused for DOCKER_HEALTH_CACHE_TTL seconds, so a /health
+        call and back-to-back chat requests share one probe.
+
         Returns:
-            True if 'docker ps' executes successfully, False otherwise.
+            True if the daemon answers a ping, False otherwise.
         """
+        now = time.monotonic()
+        if (
+            self._health_cache is not None
+            and now - self._health_cache[0] < DOCKER_HEALTH_CACHE_TTL
+        ):
+            return self._health_cache[1]
+
         try:
-            # A simple 'docker ps' is a reliable way to check Docker daemon health.
-            result = subprocess.run(["docker", "ps"], capture_output=True, timeout=2)
-            return result.returncode == 0
+            # A ping is one request on the daemon socket - no CLI process.
+            healthy = self.client is not None and bool(self.client.ping())
         except Exception:
-            # Any exception (e.g., timeout, command not found) means Docker is not healthy.
-            return False
+            # Any exception (e.g., timeout, socket missing) means Docker is not healthy.
+            healthy = False
+
+        self._health_cache = (now, healthy)
+        return healthy
 
     def get_container_info(self) -> Dict[str, Any]:
         """
@@ -93,48 +167,70 @@ class DockerService:
             command: The MCP command to execute (e.g., "server list").
 
         Returns:
-            A string containing the command's stdout or a descriptive error message.
+            A string containing the command's stdout.
+
+        Raises:
+            DockerCommandError: If the command exits non-zero or cannot start.
+            DockerTimeoutError: If the command runs past DOCKER_COMMAND_TIMEOUT.
         """
         try:
             print(f"→ Executing MCP command: docker mcp {command}")
 
             # The command is split into parts for security and correctness.
-            cmd_parts = ["docker", "mcp"] + command.split()
+            cmd_parts = ["docker", "mcp", *_split_command(command)]
 
-            # Execute the command with a 30-second timeout to prevent hangs.
+            # Execute the command with a timeout to prevent hangs.
             result = subprocess.run(
-                cmd_parts, capture_output=True, text=True, timeout=30
+                cmd_parts,
+                capture_output=True,
+                text=True,
+                timeout=DOCKER_COMMAND_TIMEOUT,
             )
 
-            # Process the result based on the return code.
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                print(f"✓ Command succeeded: {output[:100]}...")
-                return (
-                    output
-                    if output
-                    else "(Command completed successfully with no output)"
-                )
-            else:
-                # Return stderr if available, otherwise a generic error.
-                error = (
-                    result.stderr.strip()
-                    if result.stderr
-                    else f"Command failed with exit code {result.returncode}"
-                )
-                print(f"✗ Command failed: {error}")
-                return f"Error: {error}"
-
         except subprocess.TimeoutExpired:
-            error_msg = "Command timed out after 30 seconds"
-            print(f"✗ {error_msg}")
-            return f"Error: {error_msg}"
+            print(f"✗ Command timed out after {DOCKER_COMMAND_TIMEOUT} seconds")
+            raise DockerTimeoutError(command, DOCKER_COMMAND_TIMEOUT)
+
+        except (OSError, ValueError) as e:
+            # e.g. the docker CLI is not on PATH, or unbalanced quotes
+            print(f"✗ Could not run command: {e}")
+            raise DockerCommandError(command, str(e))
+
+        # Process the result based on the return code.
+        if result.returncode != 0:
+            # Use stderr if available, otherwise a generic error.
+            error = (
+                result.stderr.strip()
+                if result.stderr
+                else f"Command failed with exit code {result.returncode}"
+            )
+            print(f"✗ Command failed: {error}")
+            raise DockerCommandError(command, error, result.returncode)
 
-        except Exception as e:
-            # Catch-all for other potential issues (e.g., file not found).
-            error_msg = f"An unexpected error occurred: {str(e)}"
-            print(f"✗ {error_msg}")
-            return f"Error: {error_msg}"
+        output = result.stdout.strip()
+        print(f"✓ Command succeeded: {output[:100]}...")
+        return output if output else "(Command completed successfully with no output)"
+
+    async def aexecute_mcp_command(self, command: str) -> str:
+        """
+        Runs execute_mcp_command in a worker thread for async callers.
+
+        At most MCP_MAX_CONCURRENT_COMMANDS commands run at once; further
+        calls wait for a free slot without blocking the event loop.
+
+        Args:
+            command: The MCP command to execute (e.g., "server list").
+
+        Returns:
+            A string containing the command's stdout.
+
+        Raises:
+            DockerCommandError: If the command exits non-zero or cannot start.
+            DockerTimeoutError: If the command runs past DOCKER_COMMAND_TIMEOUT.
+        """
+        return await anyio.to_thread.run_sync(
+            partial(self.execute_mcp_command, command), limiter=_mcp_limiter
+        )
 
     def list_containers(self) -> str:
         """
@@ -146,44 +242,31 @@ class DockerService:
         Returns:
             A formatted string of container information or an error message.
         """
-        try:
-            # The command is formatted to return only the necessary fields.
-            result = subprocess.run(
-                [
-                    "docker",
-                    "ps",
-                    "-a",  # Include all containers (running and stopped).
-                    "--format",
-                    "{{.Names}}\t{{.Status}}\t{{.Image}}",
-                ],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-
-            if result.returncode != 0:
-                return (
-                    "Error: Could not list containers due to a Docker command failure."
-                )
-
-            output = result.stdout.strip()
-            if not output:
-                return "No containers found on this system."
-
-            # Format the output for better readability.
-            lines = output.splitlines()
-            container_details = [line.split("\t") for line in lines]
-            formatted_output = "Containers on this system:\n\n" + "\n".join(
-                f"• {name}\n  Status: {status}\n  Image: {image}\n"
-                for name, status, image in container_details
-                if len(container_details) >= 3
-            )
-
-            return formatted_output.rstrip()
+        if self.client is None:
+            return f"Error: Docker is not available ({self.connection_error})."
 
+        try:
+            # Include all containers (running and stopped).
+            containers = self.client.containers.list(all=True)
         except Exception as e:
             return f"Error listing containers: {str(e)}"
 
+        if not containers:
+            return "No containers found on this system."
+
+        # Format the output for better readability. The image name is read
+        # from attrs, which the list call already fetched; container.image
+        # would make one more daemon request per container.
+        return (
+            "Containers on this system:\n\n"
+            + "\n".join(
+                f"• {container.name}\n"
+                f"  Status: {container.status}\n"
+                f"  Image: {container.attrs['Config']['Image']}\n"
+                for container in containers
+            ).rstrip()
+        )
+
     def get_logs(self, container_name: str, tail: int = 50) -> str:
         """
         Retrieves recent logs from a specified container.
@@ -195,28 +278,23 @@ class DockerService:
         Returns:
             The container's log output or an error message.
         """
-        try:
-            # Use the provided container_name instead of a hardcoded one.
-            result = subprocess.run(
-                ["docker", "logs", "--tail", str(tail), container_name],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-
-            if result.returncode != 0:
-                return f"Error: Container '{container_name}' not found or not running."
-
-            logs = result.stdout.strip()
-            return (
-                f"Last {tail} lines of logs for '{container_name}':\n\n{logs}"
-                if logs
-                else "No logs available for this container."
-            )
+        if self.client is None:
+            return f"Error: Docker is not available ({self.connection_error})."
 
+        try:
+            container = self.client.containers.get(container_name)
+            logs = container.logs(tail=tail).decode("utf-8", errors="replace").strip()
+        except NotFound:
+            return f"Error: Container '{container_name}' not found or not running."
         except Exception as e:
             return f"Error retrieving logs for '{container_name}': {str(e)}"
 
+        return (
+            f"Last {tail} lines of logs for '{container_name}':\n\n{logs}"
+            if logs
+            else "No logs available for this container."
+        )
+
 
 # Singleton instance to ensure only one DockerService is used.
 _docker_service_instance: Optional[DockerService] = None
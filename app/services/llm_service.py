@@ -9,11 +9,12 @@ Handles all interactions with Google Gemini API, including:
 - Direct Notion API integration
 """
 
+import anyio
 import google.generativeai as genai
 import google.ai.generativelanguage as glm
 import requests
 import json
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 from app.config import (
     GOOGLE_API_KEY,
     GEMINI_MODEL_PRIMARY,
@@ -353,6 +354,35 @@ Use all available tools without hesitation."""
             )
             return f"An unexpected error occurred: {e}"
 
+    async def _aexecute_function_call(
+        self, function_name: str, args: Dict[str, Any]
+    ) -> str:
+        """
+        Runs a function call without blocking the event loop.
+
+        MCP commands go through the Docker service's bounded worker pool;
+        other tools run in a worker thread via _execute_function_call.
+
+        Args:
+            function_name: The name of the function to call.
+            args: A dictionary of arguments for the function.
+
+        Returns:
+            The result of the function execution as a string.
+        """
+        command = args.get("command")
+        if function_name != "execute_command" or not command:
+            return await anyio.to_thread.run_sync(
+                self._execute_function_call, function_name, args
+            )
+
+        logger.info(f"LLM calling function: {function_name} with args: {args}")
+        try:
+            return await self.docker_service.aexecute_mcp_command(command)
+        except (DockerCommandError, DockerTimeoutError) as e:
+            logger.error(f"Docker error during function call '{function_name}': {e}")
+            return f"Error executing Docker command: {e}"
+
     def _make_notion_api_call(
         self, method: str, endpoint: str, body: Dict[str, Any], api_version: str
     ) -> str:
@@ -610,7 +640,12 @@ Use all available tools without hesitation."""
 
         return True
 
-    async def get_response(self, prompt: str, history: List[Dict[str, Any]]) -> str:
+    async def get_response(
+        self,
+        prompt: str,
+        history: List[Dict[str, Any]],
+        usage: Optional[Dict[str, int]] = None,
+    ) -> str:
         """
         Generates a response using the agentic loop with tool use.
         Automatically switches to fallback models on rate limit errors.
@@ -625,6 +660,8 @@ Use all available tools without hesitation."""
         Args:
             prompt: The user's current message
             history: Previous conversation messages
+            usage: Optional dict that receives "output_tokens" when the API
+                reports a token count for the final answer
 
         Returns:
             The assistant's response as a string
@@ -633,21 +670,7 @@ Use all available tools without hesitation."""
 
         for retry_attempt in range(max_model_retries):
             try:
-                # Build the conversation history in Gemini's format
-                # Add system instruction as the first message
-                history_with_system = [
-                    {"role": "user", "parts": [self.system_instruction]},
-                    {
-                        "role": "model",
-                        "parts": [
-                            "Understood! I have direct access to Docker "
-                            "MCP tools and will use them proactively to "
-                            "answer your questions."
-                        ],
-                    },
-                ] + self._convert_history(history)
-
-                chat = self.model.start_chat(history=history_with_system)
+                chat = self._start_chat(history)
 
                 # Send the user's prompt - tools are already configured in the model
                 logger.info(
@@ -673,7 +696,7 @@ Use all available tools without hesitation."""
                         logger.info(f"Iteration {iteration}: Function call requested")
 
                         # Execute the function
-                        function_result = self._execute_function_call(
+                        function_result = await self._aexecute_function_call(
                             function_name, function_args
                         )
 
@@ -720,6 +743,11 @@ Use all available tools without hesitation."""
                     f"{'...' if len(final_response) > 100 else ''}"
                 )
 
+                if usage is not None:
+                    output_tokens = self._output_tokens(response)
+                    if output_tokens is not None:
+                        usage["output_tokens"] = output_tokens
+
                 return final_response
 
             except Exception as e:
@@ -764,6 +792,124 @@ Use all available tools without hesitation."""
             "Please try again in a minute."
         )
 
+    async def stream_response(
+        self, prompt: str, history: List[Dict[str, Any]]
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of get_response that yields reply text as it arrives.
+
+        Tool calls are resolved exactly as in the agentic loop, and only the
+        final answer is streamed. If the request fails before any tool ran or
+        any text was sent, it falls back to get_response, which handles
+        rate-limit model switching and error messages. Later failures are
+        re-raised, since replaying the loop would run the tools again.
+
+        Args:
+            prompt: The user's current message
+            history: Previous conversation messages
+
+        Yields:
+            Chunks of the assistant's response text
+        """
+        started = False  # A tool has run or text was sent - no replay
+        try:
+            chat = self._start_chat(history)
+            logger.info(
+                f"User prompt (stream): {prompt[:100]}{'...' if len(prompt) > 100 else ''}"
+            )
+            message: Any = prompt
+
+            for iteration in range(1, 6):  # Same tool-use cap as get_response
+                response = await chat.send_message_async(message, stream=True)
+
+                # The first chunk is already fetched and says whether this is a
+                # function call (sent whole) or the start of the text answer
+                function_call = response.candidates[0].content.parts[0].function_call
+                if not function_call:
+                    async for chunk in response:
+                        if chunk.parts:
+                            started = True
+                            yield chunk.text
+                    return
+
+                await response.resolve()
+                logger.info(f"Iteration {iteration}: Function call requested")
+                started = True
+                function_result = await self._aexecute_function_call(
+                    function_call.name, dict(function_call.args)
+                )
+                message = glm.Content(
+                    parts=[
+                        glm.Part(
+                            function_response=glm.FunctionResponse(
+                                name=function_call.name,
+                                response={"result": function_result},
+                            )
+                        )
+                    ]
+                )
+
+            logger.warning("Reached maximum number of tool uses")
+            yield (
+                "I apologize, but I reached the maximum number of "
+                "tool uses. Please try rephrasing your request."
+            )
+
+        except Exception as e:
+            if started:
+                raise
+            logger.warning(f"Streaming failed before output, retrying unstreamed: {e}")
+            yield await self.get_response(prompt=prompt, history=history)
+
+    @staticmethod
+    def _output_tokens(response: Any) -> Optional[int]:
+        """
+        Reads the generated-token count the API reported for a response.
+
+        Newer SDKs expose usage_metadata; older ones only carry a per-
+        candidate token_count, which is 0 when the API didn't fill it in.
+
+        Args:
+            response: A Gemini GenerateContentResponse
+
+        Returns:
+            The token count, or None if the response doesn't include one
+        """
+        try:
+            count = getattr(response, "usage_metadata", None)
+            count = getattr(count, "candidates_token_count", None)
+            if count is None:
+                count = response.candidates[0].token_count
+        except (AttributeError, IndexError):
+            return None
+        return count if isinstance(count, int) and count > 0 else None
+
+    def _start_chat(self, history: List[Dict[str, Any]]):
+        """
+        Starts a chat session primed with the system instruction.
+
+        Args:
+            history: Previous conversation messages in API format
+
+        Returns:
+            A Gemini ChatSession for the current model
+        """
+        # Build the conversation history in Gemini's format
+        # Add system instruction as the first message
+        history_with_system = [
+            {"role": "user", "parts": [self.system_instruction]},
+            {
+                "role": "model",
+                "parts": [
+                    "Understood! I have direct access to Docker "
+                    "MCP tools and will use them proactively to "
+                    "answer your questions."
+                ],
+            },
+        ] + self._convert_history(history)
+
+        return self.model.start_chat(history=history_with_system)
+
     def _convert_history(self, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Converts the API history format to Gemini's expected format.
@@ -51,7 +51,17 @@ start_backend() {
 
     echo "🚀 Starting backend daemon..."
     cd "$SCRIPT_DIR"
-    nohup "$UVICORN_BIN" app.main:app --host 0.0.0.0 --port 8000 >> "$BACKEND_LOG" 2>&1 &
+    # Single worker: conversation history and WebSocket turns live in-process.
+    # A deep backlog and a concurrency cap keep /health probes from queueing
+    # behind long-running chat requests.
+    UVICORN_ARGS=(--host 0.0.0.0 --port 8000 --backlog 2048 --limit-concurrency 256)
+    # Use the faster event loop and HTTP parser when installed (uvicorn[standard])
+    if "$PYTHON_BIN" -c "import uvloop, httptools" > /dev/null 2>&1; then
+        UVICORN_ARGS+=(--loop uvloop --http httptools)
+    else
+        echo "ℹ️  uvloop/httptools not installed - using the default asyncio loop"
+    fi
+    nohup "$UVICORN_BIN" app.main:app "${UVICORN_ARGS[@]}" >> "$BACKEND_LOG" 2>&1 &
     echo $! > "$BACKEND_PID_FILE"
 
     # Wait up to 120 seconds for backend to become healthy (startup can take ~2 minutes)
@@ -91,7 +101,8 @@ start_frontend() {
 
     echo "🎨 Starting frontend daemon..."
     cd "$SCRIPT_DIR"
-    nohup "$STREAMLIT_BIN" run frontend/chat_ui.py --server.port 8501 --server.address 0.0.0.0 --server.headless true >> "$FRONTEND_LOG" 2>&1 &
+    # postScriptGC=false skips Streamlit's full gc.collect() after every rerun
+    nohup "$STREAMLIT_BIN" run frontend/chat_ui.py --server.port 8501 --server.address 0.0.0.0 --server.headless true --runner.postScriptGC false >> "$FRONTEND_LOG" 2>&1 &
     echo $! > "$FRONTEND_PID_FILE"
     sleep 2
     echo "✅ Frontend running (PID: $(cat $FRONTEND_PID_FILE))"
@@ -12,31 +12,36 @@ A radically simplified, high-performance chat UI that focuses on:
 
 import streamlit as st
 import requests
-from typing import List, Dict, Any
-from datetime import datetime
-from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+from types import ModuleType
+from typing import List, Dict, Any, Iterator, Optional
+import time
 import json
+from uuid import uuid4
 from auth import check_authentication, show_logout_button
 
+orjson: Optional[ModuleType]
+try:  # C-accelerated JSON when available; stdlib json is the fallback
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 # --- Config (Constants Only) ---
-FASTAPI_URL = "http://127.0.0.1:8000/chat"
+STREAM_URL = "http://127.0.0.1:8000/chat/stream"
 HEALTH_URL = "http://127.0.0.1:8000/health"
-
-# --- Streamlit Config (MUST be first Streamlit command) ---
-st.set_page_config(
-    page_title="MCP AI Assistant",
-    page_icon="🤖",
-    layout="wide",
-    initial_sidebar_state="expanded",
-)
-
-# --- Authentication Check (immediately after page_config) ---
-if not check_authentication():
-    st.stop()
-
-# --- Minimal Custom CSS (Streamlit-friendly) ---
-st.markdown(
-    """
+HEALTH_TIMEOUT = (0.3, 2.0)  # (connect, read) - localhost should answer fast
+HEALTH_MISS_TTL_S = 3.0  # Reuse a failed probe this long before retrying
+HEALTH_PANEL_REFRESH = "10s"  # Sidebar status self-refresh cadence (fragments only)
+STREAM_TIMEOUT = (5, 300)  # Read budget is per frame, so slow tool calls fit
+SUBMIT_DEBOUNCE_S = 0.3  # Ignore repeat submits closer together than this
+RECENT_BUBBLES = 6  # Newest messages drawn as chat bubbles; older ones are batched
+STREAM_FLUSH_CHARS = 8  # New chars needed before the live reply is re-rendered
+STREAM_FLUSH_INTERVAL_S = 0.05  # ...and at most ~20 re-renders per second
+
+# --- Static CSS (one constant, sent as a single element) ---
+CUSTOM_CSS = """
 <style>
     /* Subtle enhancements only - let Streamlit handle the rest */
     .stChatMessage {
@@ -54,55 +59,178 @@ st.markdown(
         padding-top: 2rem !important;
     }
 </style>
-""",
-    unsafe_allow_html=True,
+"""
+
+# --- Streamlit Config (MUST be first Streamlit command) ---
+st.set_page_config(
+    page_title="MCP AI Assistant",
+    page_icon="🤖",
+    layout="wide",
+    initial_sidebar_state="expanded",
 )
 
+# --- Authentication Check (immediately after page_config) ---
+if not check_authentication():
+    st.stop()
+
+# --- Minimal Custom CSS (Streamlit-friendly) ---
+# Re-emitted every run on purpose: Streamlit drops elements a rerun doesn't
+# re-send, so a "first run only" flag would strip the styles after one click.
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
 
 # --- Optimized Helper Functions ---
 
 
-@lru_cache(maxsize=1)
-@st.cache_data(ttl=10)  # Cache for 10 seconds
+def _json_loads(data: bytes) -> Any:
+    """Parse JSON bytes - orjson fast path, no str decode needed."""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _json_dumps_pretty(obj: Any) -> str:
+    """Indented JSON for exports - non-JSON values fall back to str()."""
+    if orjson:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, default=str, indent=2)
+
+
+def _clock(timestamp: float) -> str:
+    """Local time like "3:07 PM" - portable %I, since %-I fails on Windows."""
+    return time.strftime("%I:%M %p", time.localtime(timestamp)).lstrip("0")
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Keep-alive pool to the backend - one per process, survives reruns."""
+    session = requests.Session()
+    # Retry idempotent GETs on gateway-style 5xx; POSTs are never re-sent, and
+    # connect=0 keeps a dead backend failing fast instead of backing off.
+    retry = Retry(
+        total=2,
+        connect=0,
+        backoff_factor=0.1,
+        status_forcelist=[502, 503, 504],
+        raise_on_status=False,
+    )
+    session.mount(
+        "http://",
+        HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry),
+    )
+    # urllib3 lists every codec it can decode here (br/zstd only when their
+    # packages are installed); the backend's GZipMiddleware answers with gzip
+    session.headers.update(
+        {"Connection": "keep-alive", "Accept-Encoding": ACCEPT_ENCODING}
+    )
+    return session
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _fetch_health() -> Dict[str, Any]:
+    """Cached health GET - raises on failure so errors are never cached."""
+    response = get_http_session().get(HEALTH_URL, timeout=HEALTH_TIMEOUT)
+    response.raise_for_status()
+    return _json_loads(response.content)
+
+
+@st.cache_resource
+def _health_miss() -> Dict[str, Any]:
+    """Process-wide holder for the last failed probe (survives reruns)."""
+    return {"at": 0.0, "result": None}
+
+
 def check_backend_health() -> Dict[str, Any]:
-    """Cached health check - prevents redundant calls."""
+    """Health status for the sidebar - successes cached 5s, failures 3s."""
+    miss = _health_miss()
+    if miss["result"] is not None and time.monotonic() - miss["at"] < HEALTH_MISS_TTL_S:
+        return miss["result"]
     try:
-        response = requests.get(HEALTH_URL, timeout=3)
-        response.raise_for_status()
-        return response.json()
+        return _fetch_health()
     except Exception as e:
-        return {
+        result = {
             "status": "unreachable",
             "error": str(e),
             "docker_connected": False,
             "llm_configured": False,
         }
+        miss.update(at=time.monotonic(), result=result)
+        return result
 
 
-def send_chat_message(prompt: str, history: List[Dict[str, str]]) -> str:
-    """Send message to backend - streamlined error handling."""
-    try:
-        # Clean history - remove timestamp and other non-serializable fields
-        clean_history = [
-            {"role": msg["role"], "content": msg["content"]} for msg in history
-        ]
+def _refresh_health():
+    """Button callback - drop both the cached status and any cached failure."""
+    _fetch_health.clear()
+    _health_miss()["result"] = None
 
-        response = requests.post(
-            FASTAPI_URL,
-            json={"prompt": prompt, "history": clean_history},
-            timeout=60,
-        )
-        response.raise_for_status()
-        return response.json()["reply"]
+
+def stream_chat(prompt: str, session_id: str) -> Iterator[str]:
+    """Yield reply text from the backend's SSE stream - errors become text."""
+    try:
+        with get_http_session().post(
+            STREAM_URL,
+            # History lives server-side under session_id - only the prompt is sent
+            json={"prompt": prompt, "session_id": session_id},
+            stream=True,
+            timeout=STREAM_TIMEOUT,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                frame = _json_loads(line[6:])
+                if frame["type"] == "delta":
+                    yield frame["text"]
+                elif frame["type"] == "error":
+                    yield f"❌ {frame['text']}"
+                    return
+                elif frame["type"] == "done":
+                    return
 
     except requests.exceptions.Timeout:
-        return "⏱️ Request timed out. Try a simpler query."
+        yield "⏱️ Request timed out. Try a simpler query."
 
     except requests.exceptions.ConnectionError:
-        return "❌ Backend offline. Run `./daemon.sh start`"
+        yield "❌ Backend offline. Run `./daemon.sh start`"
+
+    except requests.exceptions.HTTPError as e:
+        # Pre-stream failures (e.g. 503 Docker down) carry a JSON detail
+        try:
+            detail = _json_loads(e.response.content).get("detail", str(e))
+        except Exception:
+            detail = str(e)
+        yield f"❌ Error ({e.response.status_code}): {detail}"
 
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        yield f"❌ Error: {str(e)}"
+
+
+def _export_json(messages: List[Dict[str, Any]]) -> str:
+    """Export blob memoized per session - re-serialized only when messages change."""
+    key = (len(messages), messages[-1].get("timestamp"))
+    cached = st.session_state.get("_export_cache")
+    if cached is None or cached[0] != key:
+        blob = _json_dumps_pretty(
+            {
+                "exported": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "messages": messages,
+            }
+        )
+        cached = st.session_state._export_cache = (key, blob)
+    return cached[1]
+
+
+def _older_history_markdown(older: List[Dict[str, Any]]) -> str:
+    """Older turns as one markdown blob, rebuilt only when the chat grows or clears."""
+    key = (st.session_state.chat_key, len(older))
+    cached = st.session_state.get("_older_history_md")
+    if cached is None or cached[0] != key:
+        parts = []
+        for msg in older:
+            label = "🧑 **You**" if msg["role"] == "user" else "🤖 **Assistant**"
+            if isinstance(msg.get("timestamp"), float):
+                label = f"{label} · {_clock(msg['timestamp'])}"
+            parts.append(f"{label}\n\n{msg['content']}")
+        cached = st.session_state._older_history_md = (key, "\n\n---\n\n".join(parts))
+    return cached[1]
 
 
 def init_session_state():
@@ -119,17 +247,62 @@ I can help you with:
 - 🔧 System monitoring & logs
 
 **Quick Start:** Try "List my Notion databases" or click a button below!""",
-                "timestamp": datetime.now(),
+                "timestamp": time.time(),
             }
         ]
 
     if "chat_key" not in st.session_state:
         st.session_state.chat_key = 0  # For forcing chat input refresh
 
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid4().hex  # Backend history key
+
 
 # --- Sidebar (Streamlined) ---
 
 
+def _clear_chat():
+    """Button callback - keep only the welcome message."""
+    st.session_state.messages = st.session_state.messages[:1]
+    st.session_state.chat_key += 1
+    st.session_state.session_id = uuid4().hex  # Fresh backend history
+
+
+def _queue_prompt(prompt: str):
+    """Button callback - picked up by render_chat in the same rerun."""
+    st.session_state.pending_prompt = prompt
+
+
+# st.fragment (1.37+, experimental_fragment in 1.33-1.36) reruns just the wrapped
+# function. Older Streamlit lacks both, so the panel renders with the full script.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+
+def _health_panel():
+    """Backend status block - isolated from chat reruns where fragments exist."""
+    with st.container():
+        health = check_backend_health()
+
+        if health.get("status") == "healthy":
+            st.success("✅ System Healthy")
+            with st.expander("📊 Details"):
+                st.metric("Docker", "✓ Connected")
+                st.metric("LLM", health.get("model", "Unknown"))
+        else:
+            st.error("❌ Backend Offline")
+            if st.button("🔧 Troubleshoot"):
+                st.code("./daemon.sh start", language="bash")
+
+
+# Only the status block is a fragment: the sidebar buttons change chat state,
+# and a fragment-scoped rerun would leave the main area stale.
+render_health_panel = (
+    _fragment(run_every=HEALTH_PANEL_REFRESH)(_health_panel)
+    if _fragment
+    else _health_panel
+)
+
+
 def render_sidebar():
     """Clean, focused sidebar with essential controls."""
     with st.sidebar:
@@ -141,18 +314,7 @@ def render_sidebar():
         show_logout_button()
 
         st.divider()
-        with st.container():
-            health = check_backend_health()
-
-            if health.get("status") == "healthy":
-                st.success("✅ System Healthy")
-                with st.expander("📊 Details"):
-                    st.metric("Docker", "✓ Connected")
-                    st.metric("LLM", health.get("model", "Unknown"))
-            else:
-                st.error("❌ Backend Offline")
-                if st.button("🔧 Troubleshoot"):
-                    st.code("./daemon.sh start", language="bash")
+        render_health_panel()
 
         st.divider()
 
@@ -160,30 +322,23 @@ def render_sidebar():
         st.subheader("⚡ Quick Actions")
 
         # Single column for cleaner look
-        if st.button("🗑️ Clear Chat", use_container_width=True, key="clear"):
-            st.session_state.messages = st.session_state.messages[:1]  # Keep welcome
-            st.session_state.chat_key += 1
-            st.rerun()
-
-        if st.button("🔄 Refresh", use_container_width=True, key="refresh"):
-            st.cache_data.clear()  # Clear all cached data
-            st.rerun()
+        # on_click callbacks run before the click's rerun, so no second st.rerun()
+        st.button(
+            "🗑️ Clear Chat", use_container_width=True, key="clear", on_click=_clear_chat
+        )
+        st.button(
+            "🔄 Refresh",
+            use_container_width=True,
+            key="refresh",
+            on_click=_refresh_health,  # Force a fresh health check
+        )
 
         # Export (only if there's content)
         if len(st.session_state.messages) > 1:
-            export_data = json.dumps(
-                {
-                    "exported": datetime.now().isoformat(),
-                    "messages": st.session_state.messages,
-                },
-                default=str,
-                indent=2,
-            )
-
             st.download_button(
                 "💾 Export Chat",
-                export_data,
-                f"chat_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                _export_json(st.session_state.messages),
+                f"chat_{time.strftime('%Y%m%d_%H%M%S')}.json",
                 "application/json",
                 use_container_width=True,
             )
@@ -201,10 +356,13 @@ def render_sidebar():
             }
 
             for label, prompt in suggestions.items():
-                if st.button(label, use_container_width=True, key=f"sugg_{label}"):
-                    # Add to messages and trigger processing
-                    st.session_state.pending_prompt = prompt
-                    st.rerun()
+                st.button(
+                    label,
+                    use_container_width=True,
+                    key=f"sugg_{label}",
+                    on_click=_queue_prompt,
+                    args=(prompt,),
+                )
 
         st.divider()
 
@@ -223,13 +381,20 @@ def render_chat():
     st.title("💬 Chat")
 
     # Display messages
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
+    messages = st.session_state.messages
+    recent = messages[-RECENT_BUBBLES:]
+    if len(messages) > RECENT_BUBBLES:
+        # Older turns go out as one element instead of several per message
+        st.markdown(_older_history_markdown(messages[:-RECENT_BUBBLES]))
+
+    for msg in recent:
+        # One container per bubble keeps the element tree shape stable across reruns
+        with st.chat_message(msg["role"]), st.container(border=False):
             st.markdown(msg["content"])
 
             # Timestamp (subtle)
-            if "timestamp" in msg and isinstance(msg["timestamp"], datetime):
-                st.caption(msg["timestamp"].strftime("%-I:%M %p"))
+            if isinstance(msg.get("timestamp"), float):
+                st.caption(_clock(msg["timestamp"]))
 
     # Handle pending prompt from sidebar
     if "pending_prompt" in st.session_state:
@@ -252,12 +417,30 @@ def render_chat():
 def process_message(prompt: str):
     """Process a user message - separated for reusability."""
 
+    # Debounce - drop Enter-key repeats and submits while a request is running
+    now = time.monotonic()
+    if (
+        st.session_state.get("_in_flight")
+        or now - st.session_state.get("_last_submit", 0.0) < SUBMIT_DEBOUNCE_S
+    ):
+        return
+    st.session_state._in_flight = True
+    st.session_state._last_submit = now
+    try:
+        _exchange(prompt)
+    finally:
+        st.session_state._in_flight = False
+
+
+def _exchange(prompt: str):
+    """Append the user message, fetch the reply and append it."""
+
     # Add user message
     st.session_state.messages.append(
         {
             "role": "user",
             "content": prompt,
-            "timestamp": datetime.now(),
+            "timestamp": time.time(),
         }
     )
 
@@ -267,19 +450,31 @@ def process_message(prompt: str):
 
     # Get response
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            # Prepare history (exclude current prompt)
-            history = st.session_state.messages[:-1]
-            reply = send_chat_message(prompt, history)
-
-        st.markdown(reply)
+        placeholder = st.empty()
+        reply = ""
+        shown = 0
+        last_flush = time.monotonic()
+        for chunk in stream_chat(prompt, st.session_state.session_id):
+            reply += chunk
+            # Publish gate: the first text paints at once (it is the progress
+            # signal); after that, enough new text AND enough time since the
+            # last paint, so real token streams repaint at most ~20 Hz
+            now = time.monotonic()
+            if not shown or (
+                len(reply) - shown >= STREAM_FLUSH_CHARS
+                and now - last_flush >= STREAM_FLUSH_INTERVAL_S
+            ):
+                placeholder.text(reply + "▌")  # Plain text - no markdown parse
+                shown = len(reply)
+                last_flush = now
+        placeholder.markdown(reply)  # Single markdown render once complete
 
     # Add assistant message
     st.session_state.messages.append(
         {
             "role": "assistant",
             "content": reply,
-            "timestamp": datetime.now(),
+            "timestamp": time.time(),
         }
     )
 
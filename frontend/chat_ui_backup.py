@@ -14,24 +14,70 @@ Features:
 
 import streamlit as st
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import time
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from datetime import datetime
+import hashlib
 import json
-
-# Setup logging for frontend
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+import re
+
+try:  # C-accelerated JSON when available; stdlib json is the fallback
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Setup logging for frontend. Streamlit re-executes this script on every
+# rerun, so the handlers hang off a named logger and are created by
+# st.cache_resource functions, which run once per process. Records go
+# through a queue; a background QueueListener does the actual writes so
+# logging never blocks the script thread on console or disk I/O.
+logger = logging.getLogger("frontend.chat_ui")
+_LOG_FORMAT = logging.Formatter(
+    "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(Path(__file__).parent.parent / "logs" / "frontend.log"),
-    ],
 )
-logger = logging.getLogger(__name__)
+
+
+@st.cache_resource(show_spinner=False)
+def _log_listener() -> QueueListener:
+    """Starts the background log writer (console only until file logging is enabled)."""
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(_LOG_FORMAT)
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    listener = QueueListener(log_queue, console_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return listener
+
+
+@st.cache_resource(show_spinner=False)
+def _enable_file_logging() -> RotatingFileHandler:
+    """
+    Opens logs/frontend.log and adds it to the log writer.
+
+    Deferred until the first health check or chat turn, so script start
+    doesn't pay for resolving and opening the log file.
+    """
+    file_handler = RotatingFileHandler(
+        Path(__file__).parent.parent / "logs" / "frontend.log",
+        maxBytes=5_000_000,
+        backupCount=3,
+    )
+    file_handler.setFormatter(_LOG_FORMAT)
+    listener = _log_listener()
+    listener.handlers = listener.handlers + (file_handler,)
+    return file_handler
+
+
+_log_listener()
 
 
 # --- Page Configuration ---
@@ -51,6 +97,46 @@ st.set_page_config(
 # --- Constants ---
 FASTAPI_URL = "http://127.0.0.1:8000/chat"
 HEALTH_URL = "http://127.0.0.1:8000/health"
+HEALTH_FRESH_S = 5.0  # Matches the check_backend_health cache TTL
+RECENT_BUBBLES = 10  # Newest messages drawn as chat bubbles
+
+# User-facing messages for expected backend status codes
+_HTTP_ERROR_MESSAGES = {
+    503: "⚠️ Backend service unavailable. Check if Docker is running and the MCP container is started.",
+    422: "❌ Invalid request format. Please check your input.",
+    429: "⚠️ Rate limit exceeded. Please wait a moment and try again.",
+}
+
+
+def _json_loads(data: bytes) -> Any:
+    """Parses a JSON body, using orjson when it is installed."""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _json_dumps_pretty(obj: Any) -> str:
+    """Serializes to indented JSON, using orjson when it is installed."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def _minify_css(css: str) -> str:
+    """
+    Strips comments and redundant whitespace from a CSS block.
+
+    The stylesheet is re-sent on every rerun, so shrinking it once here cuts
+    the bytes shipped over the websocket for each interaction.
+
+    Args:
+        css: CSS source, optionally wrapped in <style> tags
+
+    Returns:
+        The same rules with comments removed and whitespace collapsed
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
 
 
 # --- Custom CSS for Beautiful UI ---
@@ -406,15 +492,141 @@ CUSTOM_CSS = """
     ::-webkit-scrollbar-thumb:hover {
         background: #a5b4fc;
     }
+
+    /* Sidebar resource links */
+    .mcp-links {
+        padding: 0.5rem;
+    }
+
+    .mcp-link-card {
+        display: block;
+        padding: 0.5rem;
+        margin: 0.25rem 0;
+        background: rgba(79, 70, 229, 0.1);
+        border-radius: 6px;
+        text-decoration: none;
+        color: #A5B4FC;
+        border: 1px solid rgba(79, 70, 229, 0.3);
+    }
+
+    /* Example prompt cards */
+    .mcp-prompt-card {
+        padding: 1rem;
+        border-radius: 12px;
+        border: 1px solid;
+        margin-bottom: 1rem;
+    }
+
+    .mcp-prompt-card:last-child {
+        margin-bottom: 0;
+    }
+
+    .mcp-prompt-grid {
+        display: grid;
+        grid-template-columns: 1fr 1fr;
+        gap: 1rem;
+    }
+
+    .mcp-prompt-grid .mcp-prompt-card {
+        margin-bottom: 0;
+    }
+
+    .mcp-prompt-card h4 {
+        margin: 0 0 0.5rem 0;
+    }
+
+    .mcp-prompt-card ul {
+        margin: 0;
+        padding-left: 1.5rem;
+        color: #9CA3AF;
+    }
+
+    .mcp-prompt-card.indigo {
+        background: rgba(99, 102, 241, 0.1);
+        border-color: rgba(99, 102, 241, 0.3);
+    }
+
+    .mcp-prompt-card.indigo h4 {
+        color: #A5B4FC;
+    }
+
+    .mcp-prompt-card.violet {
+        background: rgba(167, 139, 250, 0.1);
+        border-color: rgba(167, 139, 250, 0.3);
+    }
+
+    .mcp-prompt-card.violet h4 {
+        color: #C4B5FD;
+    }
+
+    .mcp-prompt-card.blue {
+        background: rgba(59, 130, 246, 0.1);
+        border-color: rgba(59, 130, 246, 0.3);
+    }
+
+    .mcp-prompt-card.blue h4 {
+        color: #93C5FD;
+    }
+
+    .mcp-prompt-card.emerald {
+        background: rgba(16, 185, 129, 0.1);
+        border-color: rgba(16, 185, 129, 0.3);
+    }
+
+    .mcp-prompt-card.emerald h4 {
+        color: #6EE7B7;
+    }
+
+    .mcp-footer {
+        display: grid;
+        grid-template-columns: repeat(3, 1fr);
+        gap: 1rem;
+        text-align: center;
+    }
+
+    .mcp-footer p {
+        margin: 0;
+    }
+
+    .mcp-footer-label {
+        color: #6b7280;
+        font-size: 0.9rem;
+    }
+
+    .mcp-footer-value {
+        font-weight: 600;
+        color: #1f2933;
+    }
 </style>
 """
 
-st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+
+@st.cache_resource
+def _minified_css() -> str:
+    """Minifies CUSTOM_CSS once per process instead of on every rerun."""
+    return _minify_css(CUSTOM_CSS)
+
+
+# Emitted on every run: Streamlit drops elements a rerun doesn't re-send, so
+# only the string work is cached, not the st.markdown call itself.
+st.markdown(_minified_css(), unsafe_allow_html=True)
 
 
 # --- Helper Functions ---
 
 
+@st.cache_resource(show_spinner=False)
+def _http_session() -> requests.Session:
+    """
+    Shared keep-alive session for backend calls.
+
+    Lives in st.cache_resource so it survives reruns; every health check
+    and chat turn reuses the pooled connection instead of a new handshake.
+    """
+    return requests.Session()
+
+
+@st.cache_data(ttl=5, show_spinner=False)
 def check_backend_health() -> Dict[str, Any]:
     """
     Checks if the FastAPI backend is running and healthy.
@@ -422,12 +634,15 @@ def check_backend_health() -> Dict[str, Any]:
     Returns:
         Health status dictionary or error info
     """
+    _enable_file_logging()
     try:
-        logger.info("Checking backend health...")
-        response = requests.get(HEALTH_URL, timeout=5)
+        logger.debug("Checking backend health...")
+        # (connect, read): a localhost backend that misses 300 ms to accept is down
+        response = _http_session().get(HEALTH_URL, timeout=(0.3, 2.0))
         response.raise_for_status()
         health_data = response.json()
-        logger.info(f"Backend health: {health_data.get('status', 'unknown')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Backend health: {health_data.get('status', 'unknown')}")
         return health_data
     except requests.exceptions.ConnectionError as e:
         logger.error(f"Backend connection error: {e}")
@@ -452,113 +667,350 @@ def check_backend_health() -> Dict[str, Any]:
         return {"status": "error", "error": f"Unexpected error: {str(e)}"}
 
 
-def send_chat_message(prompt: str, history: List[Dict[str, str]]) -> str:
+def send_chat_message(
+    prompt: str, session_id: Optional[str]
+) -> Tuple[str, Optional[int]]:
     """
     Sends a chat message to the FastAPI backend.
 
+    History lives server-side: the first turn sends no session id and the
+    backend assigns one, which is kept in st.session_state.conversation_id
+    for later turns.
+
     Args:
         prompt: The user's message
-        history: Previous conversation messages
+        session_id: The backend conversation id, or None to start one
 
     Returns:
-        The assistant's response or error message
+        The assistant's response (or an error message) and the reply's
+        token count when the backend reports one
     """
+    _enable_file_logging()
     try:
-        logger.info(f"Sending chat message: {prompt[:50]}...")
-        payload = {"prompt": prompt, "history": history}
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Sending chat message: {prompt[:50]}...")
+        payload = {"prompt": prompt}
+        if session_id:
+            payload["session_id"] = session_id
 
-        response = requests.post(
+        response = _http_session().post(
             FASTAPI_URL,
             json=payload,
             timeout=60,  # Give enough time for Docker commands
         )
         response.raise_for_status()
 
-        reply = response.json()["reply"]
-        logger.info(f"Received response: {reply[:50]}...")
-        return reply
+        data = _json_loads(response.content)
+        reply = data["reply"]
+        st.session_state.conversation_id = data.get("session_id")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Received response: {reply[:50]}...")
+        return reply, data.get("tokens")
 
     except requests.exceptions.Timeout as e:
         error_msg = "⏱️ Request timed out. The operation took too long to complete."
         logger.error(f"Chat timeout: {e}")
-        return error_msg
+        return error_msg, None
 
     except requests.exceptions.ConnectionError as e:
         error_msg = "❌ Cannot connect to the backend. Please ensure the FastAPI server is running."
         logger.error(f"Chat connection error: {e}")
-        return error_msg
+        return error_msg, None
 
     except requests.exceptions.HTTPError as e:
         logger.error(f"Chat HTTP error: {e.response.status_code} - {e}")
-        if e.response.status_code == 503:
-            return (
-                "⚠️ Backend service unavailable. Check if Docker is "
-                "running and the MCP container is started."
-            )
-        elif e.response.status_code == 422:
-            return "❌ Invalid request format. Please check your input."
-        elif e.response.status_code == 429:
-            return "⚠️ Rate limit exceeded. Please wait a moment and " "try again."
-        else:
-            try:
-                error_detail = e.response.json().get("detail", str(e))
-            except Exception:
-                error_detail = str(e)
-            return f"❌ Server error ({e.response.status_code}): " f"{error_detail}"
-
-    except requests.exceptions.JSONDecodeError as e:
+        message = _HTTP_ERROR_MESSAGES.get(e.response.status_code)
+        if message:
+            return message, None
+        try:
+            error_detail = e.response.json().get("detail", str(e))
+        except Exception:
+            error_detail = str(e)
+        return f"❌ Server error ({e.response.status_code}): {error_detail}", None
+
+    except json.JSONDecodeError as e:  # Base of both orjson's and requests' errors
         error_msg = "❌ Invalid response from server. Please try again."
         logger.error(f"JSON decode error: {e}")
-        return error_msg
+        return error_msg, None
 
     except KeyError as e:
         error_msg = "❌ Unexpected response format from server."
         logger.error(f"Missing key in response: {e}")
-        return error_msg
+        return error_msg, None
 
     except Exception as e:
         error_msg = f"❌ Unexpected error: {str(e)}"
         logger.error(f"Unexpected chat error: {e}", exc_info=True)
-        return error_msg
+        return error_msg, None
+
+
+# Example prompt cards shown on an empty conversation: (variant, title, prompts)
+EXAMPLE_PROMPTS = (
+    (
+        "indigo",
+        "🐳 Docker",
+        (
+            "List all running containers",
+            "Show me MCP server status",
+            "Get logs from the last hour",
+        ),
+    ),
+    (
+        "blue",
+        "🔧 System",
+        ("Check system health", "Show available tools", "What can you do?"),
+    ),
+    (
+        "violet",
+        "📝 Notion",
+        ("Search my workspace", "List all databases", "Create a new task page"),
+    ),
+    (
+        "emerald",
+        "💬 Natural Language",
+        (
+            "Find my latest notes",
+            "Help me debug a container",
+            "Explain how MCP works",
+        ),
+    ),
+)
+
+
+@st.cache_data
+def _example_prompts_html() -> str:
+    """
+    Builds the example prompt grid once; later reruns reuse the cached HTML.
+
+    The two-column layout comes from the .mcp-prompt-grid CSS rule, so no
+    st.columns widgets are needed.
+    """
+    cards = "".join(
+        f"<div class='mcp-prompt-card {variant}'><h4>{title}</h4><ul>"
+        + "".join(f"<li>{item}</li>" for item in items)
+        + "</ul></div>"
+        for variant, title, items in EXAMPLE_PROMPTS
+    )
+    return f"<div class='mcp-prompt-grid'>{cards}</div>"
+
+
+def _older_history_markdown(older: List[Dict[str, Any]]) -> str:
+    """
+    Renders turns that scrolled out of the bubble window as one markdown blob.
+
+    Memoized in session state like _export_blob, keyed on the count and the
+    newest older message's timestamp, so it is rebuilt only when a message
+    leaves the window or the chat is cleared.
+
+    Args:
+        older: Messages before the most recent RECENT_BUBBLES
+
+    Returns:
+        Markdown with one labelled section per message
+    """
+    key = (len(older), older[-1].get("timestamp"))
+    cached = st.session_state.get("_older_history_md")
+    if cached is None or cached[0] != key:
+        parts = []
+        for message in older:
+            label = "🧑 **You**" if message["role"] == "user" else "🤖 **Assistant**"
+            if "timestamp_display" in message:
+                label = f"{label} · {message['timestamp_display']}"
+            parts.append(f"{label}\n\n{message['content']}")
+        cached = st.session_state._older_history_md = (key, "\n\n---\n\n".join(parts))
+    return cached[1]
+
+
+def _export_blob(messages: List[Dict[str, Any]]) -> str:
+    """
+    Serializes the conversation for download, reusing the last result.
+
+    The blob is memoized in session state (not st.cache_data, which is shared
+    across sessions) and keyed on the message count plus a digest of the
+    newest message, so repeated exports of an unchanged chat are free.
+
+    Args:
+        messages: The conversation to export
+
+    Returns:
+        Indented JSON with an export timestamp and the messages
+    """
+    tail = hashlib.blake2b(messages[-1]["content"].encode(), digest_size=8)
+    key = (len(messages), tail.hexdigest())
+    cached = st.session_state.get("_export_blob")
+    if cached is None or cached[0] != key:
+        export_data = {
+            "timestamp": datetime.now().isoformat(),
+            "messages": messages,
+        }
+        cached = st.session_state._export_blob = (key, _json_dumps_pretty(export_data))
+    return cached[1]
+
+
+# Static sidebar and welcome markup, defined once instead of inline per branch
+_STATUS_HEALTHY_HTML = """
+<div style='padding: 1rem; border-radius: 8px; background: #ecfdf5; border: 1px solid #a7f3d0;'>
+    <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
+        <span style='display: inline-block; width: 10px; height: 10px; border-radius: 50%; background-color: #22c55e; margin-right: 8px;'></span>
+        <strong style='color: #15803d;'>System Healthy</strong>
+    </div>
+    <p style='margin: 0.25rem 0; font-size: 0.9rem; color: #4b5563;'>
+        ✅ All systems operational
+    </p>
+</div>
+"""
+
+_STATUS_WARNING_HTML = """
+<div style='padding: 1rem; border-radius: 8px; background: #fffbeb; border: 1px solid #fde68a;'>
+    <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
+        <span style='display: inline-block; width: 10px; height: 10px; border-radius: 50%; background-color: #f59e0b; margin-right: 8px;'></span>
+        <strong style='color: #b45309;'>Partial Availability</strong>
+    </div>
+</div>
+"""
+
+_STATUS_ERROR_HTML = """
+<div style='padding: 1rem; border-radius: 8px; background: #fef2f2; border: 1px solid #fecaca;'>
+    <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
+        <span style='display: inline-block; width: 10px; height: 10px; border-radius: 50%; background-color: #ef4444; margin-right: 8px;'></span>
+        <strong style='color: #b91c1c;'>Backend Unreachable</strong>
+    </div>
+</div>
+"""
+
+_STATUS_CARDS = {
+    "healthy": _STATUS_HEALTHY_HTML,
+    "partial": _STATUS_WARNING_HTML,
+    "unreachable": _STATUS_ERROR_HTML,
+}
+
+_RESOURCES_HTML = """
+<div class='mcp-links'>
+    <a href='http://127.0.0.1:8000/docs' target='_blank' class='mcp-link-card'>
+        📖 API Documentation
+    </a>
+    <a href='http://127.0.0.1:8000/health' target='_blank' class='mcp-link-card'>
+        🏥 Health Endpoint
+    </a>
+    <a href='http://127.0.0.1:8000/metrics' target='_blank' class='mcp-link-card'>
+        📊 System Metrics
+    </a>
+    <a href='https://developers.notion.com/reference' target='_blank' class='mcp-link-card'>
+        📝 Notion API Docs
+    </a>
+</div>
+"""
+
+_WELCOME_MSG = """👋 **Welcome to MCP AI Assistant!**
+
+I'm your intelligent companion for Docker and Notion management. Here's what I can do:
+
+**🐳 Docker & MCP:**
+- Execute commands in your containers
+- List and monitor running containers
+- Retrieve and analyze container logs
+- Manage MCP servers and tools
+
+**📝 Notion Integration:**
+- Search your workspace
+- Create and update pages
+- Query databases
+- Manage properties and schemas
+
+**💡 Smart Features:**
+- Natural language understanding
+- Proactive tool usage
+- Real-time health monitoring
+- Conversation export
+
+Try clicking one of the **Smart Actions** in the sidebar, or ask me anything!"""
+
+_SIDEBAR_HEADER_HTML = """
+<div style='text-align: center; padding: 1rem 0;'>
+    <h1 style='font-size: 2rem; margin: 0;'>🤖</h1>
+    <h2 style='margin: 0.5rem 0 0 0; font-size: 1.5rem; color: #1f2933;'>MCP AI Assistant</h2>
+    <p style='color: #4b5563; margin: 0.5rem 0 0 0; font-size: 0.9rem;'>Intelligent Docker Management</p>
+</div>
+"""
+
+_SHORTCUTS_HTML = """
+<div style='font-size: 0.9rem; color: #9CA3AF;'>
+    <p><kbd>Ctrl</kbd> + <kbd>Enter</kbd> - Send message</p>
+    <p><kbd>Ctrl</kbd> + <kbd>K</kbd> - Clear chat</p>
+    <p><kbd>Ctrl</kbd> + <kbd>R</kbd> - Refresh page</p>
+    <p><kbd>/</kbd> - Focus input field</p>
+</div>
+"""
+
+_PAGE_HEADER_HTML = """
+<div style='margin-top: -1rem; margin-bottom: 1.5rem;'>
+    <p style='font-size: 1.1rem; color: #9CA3AF; margin-bottom: 0.5rem;'>
+        Your intelligent companion for Docker MCP management and Notion integration
+    </p>
+    <div style='display: flex; gap: 0.5rem; align-items: center; flex-wrap: wrap;'>
+        <span style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                    color: white; padding: 0.25rem 0.75rem; border-radius: 12px;
+                    font-size: 0.85rem; font-weight: 600;'>
+            v2.0.0 Enhanced
+        </span>
+        <span style='background: rgba(34, 197, 94, 0.2); color: #22C55E;
+                    padding: 0.25rem 0.75rem; border-radius: 12px;
+                    font-size: 0.85rem; font-weight: 600;'>
+            ✨ New Theme
+        </span>
+        <span style='background: rgba(59, 130, 246, 0.2); color: #3B82F6;
+                    padding: 0.25rem 0.75rem; border-radius: 12px;
+                    font-size: 0.85rem; font-weight: 600;'>
+            🚀 Production Ready
+        </span>
+    </div>
+</div>
+"""
+
+_FOOTER_HTML = """
+<div class='mcp-footer'>
+    <div>
+        <p class='mcp-footer-label'>Powered by</p>
+        <p class='mcp-footer-value'>Google Gemini 🧠</p>
+    </div>
+    <div>
+        <p class='mcp-footer-label'>Built with</p>
+        <p class='mcp-footer-value'>FastAPI ⚡ & Streamlit 🎈</p>
+    </div>
+    <div>
+        <p class='mcp-footer-label'>Integrations</p>
+        <p class='mcp-footer-value'>Docker 🐳 & Notion 📝</p>
+    </div>
+</div>
+"""
 
 
 # --- Sidebar ---
 
 with st.sidebar:
     # Header with logo
-    st.markdown(
-        """
-        <div style='text-align: center; padding: 1rem 0;'>
-            <h1 style='font-size: 2rem; margin: 0;'>🤖</h1>
-            <h2 style='margin: 0.5rem 0 0 0; font-size: 1.5rem; color: #1f2933;'>MCP AI Assistant</h2>
-            <p style='color: #4b5563; margin: 0.5rem 0 0 0; font-size: 0.9rem;'>Intelligent Docker Management</p>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(_SIDEBAR_HEADER_HTML, unsafe_allow_html=True)
     st.markdown("---")
 
     # Health Status with enhanced UI
     st.subheader("📊 System Status")
 
-    with st.spinner("Checking backend..."):
-        health = check_backend_health()
-
-    # Create status indicator
-    if health.get("status") == "healthy":
-        status_html = """
-        <div style='padding: 1rem; border-radius: 8px; background: #ecfdf5; border: 1px solid #a7f3d0;'>
-            <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
-                <span style='display: inline-block; width: 10px; height: 10px; border-radius: 50%; background-color: #22c55e; margin-right: 8px;'></span>
-                <strong style='color: #15803d;'>System Healthy</strong>
-            </div>
-            <p style='margin: 0.25rem 0; font-size: 0.9rem; color: #4b5563;'>
-                ✅ All systems operational
-            </p>
-        </div>
-        """
+    # Smart Action clicks rerun the whole script; a healthy status from the
+    # last few seconds is reused without touching the cache or a spinner
+    health = st.session_state.get("_health_last", {})
+    health_age = time.monotonic() - st.session_state.get("_health_at", 0.0)
+    if health.get("status") != "healthy" or health_age >= HEALTH_FRESH_S:
+        with st.spinner("Checking backend..."):
+            health = check_backend_health()
+        st.session_state._health_last = health
+        st.session_state._health_at = time.monotonic()
+
+    # Create status indicator: one lookup picks the card, branches add details
+    status_html = _STATUS_CARDS.get(health.get("status"))
+    if status_html:
         st.markdown(status_html, unsafe_allow_html=True)
 
+    if health.get("status") == "healthy":
         # System details in expander
         with st.expander("📦 System Details", expanded=False):
             col1, col2 = st.columns(2)
@@ -575,32 +1027,12 @@ with st.sidebar:
                 st.info(f"🧠 Model: `{health.get('model')}`")
 
     elif health.get("status") == "partial":
-        status_html = """
-        <div style='padding: 1rem; border-radius: 8px; background: #fffbeb; border: 1px solid #fde68a;'>
-            <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
-                <span style='display: inline-block; width: 10px; height: 10px; border-radius: 50%; background-color: #f59e0b; margin-right: 8px;'></span>
-                <strong style='color: #b45309;'>Partial Availability</strong>
-            </div>
-        </div>
-        """
-        st.markdown(status_html, unsafe_allow_html=True)
-
         if not health.get("docker_connected"):
             st.error("🐳 Docker not connected")
         if not health.get("llm_configured"):
             st.error("🧠 LLM not configured")
 
     elif health.get("status") == "unreachable":
-        status_html = """
-        <div style='padding: 1rem; border-radius: 8px; background: #fef2f2; border: 1px solid #fecaca;'>
-            <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
-                <span style='display: inline-block; width: 10px; height: 10px; border-radius: 50%; background-color: #ef4444; margin-right: 8px;'></span>
-                <strong style='color: #b91c1c;'>Backend Unreachable</strong>
-            </div>
-        </div>
-        """
-        st.markdown(status_html, unsafe_allow_html=True)
-
         st.error(health.get("error", "Unknown error"))
 
         with st.expander("🔧 Troubleshooting", expanded=True):
@@ -635,26 +1067,27 @@ with st.sidebar:
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🔄 Refresh", use_container_width=True, type="primary"):
+            check_backend_health.clear()  # Force a fresh probe
+            st.session_state.pop("_health_at", None)
             st.rerun()
     with col2:
         if st.button("🗑️ Clear", use_container_width=True):
             st.session_state.messages = []
+            st.session_state.conversation_id = None  # Next turn opens a new session
             st.session_state.conversation_stats = {
                 "total_messages": 0,
                 "total_tokens_estimate": 0,
+                "user_count": 0,
             }
+            st.session_state._conversation_started = False
             st.rerun()
 
     # Export conversation button
     if len(st.session_state.get("messages", [])) > 1:
         if st.button("� Export Chat", use_container_width=True):
-            export_data = {
-                "timestamp": datetime.now().isoformat(),
-                "messages": st.session_state.messages,
-            }
             st.download_button(
                 label="📥 Download JSON",
-                data=json.dumps(export_data, indent=2),
+                data=_export_blob(st.session_state.messages),
                 file_name=f"chat_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json",
                 use_container_width=True,
@@ -669,15 +1102,18 @@ with st.sidebar:
         stats = st.session_state.get(
             "conversation_stats", {"total_messages": 0, "total_tokens_estimate": 0}
         )
+        if "user_count" not in stats:
+            # One-time backfill for sessions that predate the counter (e.g. kept
+            # alive across a hot reload); afterwards it is maintained on append.
+            stats["user_count"] = sum(
+                1 for m in st.session_state.messages if m["role"] == "user"
+            )
 
         col1, col2 = st.columns(2)
         with col1:
             st.metric("Messages", len(st.session_state.messages))
         with col2:
-            user_messages = len(
-                [m for m in st.session_state.messages if m["role"] == "user"]
-            )
-            st.metric("Your Queries", user_messages)
+            st.metric("Your Queries", stats.get("user_count", 0))
 
         st.markdown("---")
 
@@ -726,49 +1162,9 @@ with st.sidebar:
 
     # Add helpful keyboard shortcuts
     with st.expander("⌨️ Keyboard Shortcuts"):
-        st.markdown(
-            """
-            <div style='font-size: 0.9rem; color: #9CA3AF;'>
-                <p><kbd>Ctrl</kbd> + <kbd>Enter</kbd> - Send message</p>
-                <p><kbd>Ctrl</kbd> + <kbd>K</kbd> - Clear chat</p>
-                <p><kbd>Ctrl</kbd> + <kbd>R</kbd> - Refresh page</p>
-                <p><kbd>/</kbd> - Focus input field</p>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+        st.markdown(_SHORTCUTS_HTML, unsafe_allow_html=True)
 
-    st.markdown(
-        """
-        <div style='padding: 0.5rem;'>
-            <a href='http://127.0.0.1:8000/docs' target='_blank'
-               style='display: block; padding: 0.5rem; margin: 0.25rem 0;
-                      background: rgba(79, 70, 229, 0.1); border-radius: 6px;
-                      text-decoration: none; color: #A5B4FC; border: 1px solid rgba(79, 70, 229, 0.3);'>
-                📖 API Documentation
-            </a>
-            <a href='http://127.0.0.1:8000/health' target='_blank'
-               style='display: block; padding: 0.5rem; margin: 0.25rem 0;
-                      background: rgba(79, 70, 229, 0.1); border-radius: 6px;
-                      text-decoration: none; color: #A5B4FC; border: 1px solid rgba(79, 70, 229, 0.3);'>
-                🏥 Health Endpoint
-            </a>
-            <a href='http://127.0.0.1:8000/metrics' target='_blank'
-               style='display: block; padding: 0.5rem; margin: 0.25rem 0;
-                      background: rgba(79, 70, 229, 0.1); border-radius: 6px;
-                      text-decoration: none; color: #A5B4FC; border: 1px solid rgba(79, 70, 229, 0.3);'>
-                📊 System Metrics
-            </a>
-            <a href='https://developers.notion.com/reference' target='_blank'
-               style='display: block; padding: 0.5rem; margin: 0.25rem 0;
-                      background: rgba(79, 70, 229, 0.1); border-radius: 6px;
-                      text-decoration: none; color: #A5B4FC; border: 1px solid rgba(79, 70, 229, 0.3);'>
-                📝 Notion API Docs
-            </a>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(_RESOURCES_HTML, unsafe_allow_html=True)
 
     st.markdown("---")
 
@@ -780,33 +1176,7 @@ with st.sidebar:
 # --- Main Chat Interface ---
 
 st.title("💬 MCP AI Assistant")
-st.markdown(
-    """
-    <div style='margin-top: -1rem; margin-bottom: 1.5rem;'>
-        <p style='font-size: 1.1rem; color: #9CA3AF; margin-bottom: 0.5rem;'>
-            Your intelligent companion for Docker MCP management and Notion integration
-        </p>
-        <div style='display: flex; gap: 0.5rem; align-items: center; flex-wrap: wrap;'>
-            <span style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white; padding: 0.25rem 0.75rem; border-radius: 12px;
-                        font-size: 0.85rem; font-weight: 600;'>
-                v2.0.0 Enhanced
-            </span>
-            <span style='background: rgba(34, 197, 94, 0.2); color: #22C55E;
-                        padding: 0.25rem 0.75rem; border-radius: 12px;
-                        font-size: 0.85rem; font-weight: 600;'>
-                ✨ New Theme
-            </span>
-            <span style='background: rgba(59, 130, 246, 0.2); color: #3B82F6;
-                        padding: 0.25rem 0.75rem; border-radius: 12px;
-                        font-size: 0.85rem; font-weight: 600;'>
-                🚀 Production Ready
-            </span>
-        </div>
-    </div>
-    """,
-    unsafe_allow_html=True,
-)
+st.markdown(_PAGE_HEADER_HTML, unsafe_allow_html=True)
 
 # Initialize session state for chat history
 if "messages" not in st.session_state:
@@ -814,107 +1184,38 @@ if "messages" not in st.session_state:
     st.session_state.conversation_stats = {
         "total_messages": 0,
         "total_tokens_estimate": 0,
+        "user_count": 0,
     }
     # Add enhanced welcome message
     st.session_state.messages.append(
         {
             "role": "assistant",
-            "content": """👋 **Welcome to MCP AI Assistant!**
-
-I'm your intelligent companion for Docker and Notion management. Here's what I can do:
-
-**🐳 Docker & MCP:**
-- Execute commands in your containers
-- List and monitor running containers
-- Retrieve and analyze container logs
-- Manage MCP servers and tools
-
-**📝 Notion Integration:**
-- Search your workspace
-- Create and update pages
-- Query databases
-- Manage properties and schemas
-
-**💡 Smart Features:**
-- Natural language understanding
-- Proactive tool usage
-- Real-time health monitoring
-- Conversation export
-
-Try clicking one of the **Smart Actions** in the sidebar, or ask me anything!""",
+            "content": _WELCOME_MSG,
         }
     )
 
-# Display chat history with enhanced formatting
-for idx, message in enumerate(st.session_state.messages):
+# Display chat history with enhanced formatting. Only the newest messages
+# get their own bubble; older turns collapse into a single element, so a
+# long chat doesn't re-emit every bubble on each rerun
+_older = st.session_state.messages[:-RECENT_BUBBLES]
+if _older:
+    with st.expander(f"🕘 Earlier messages ({len(_older)})"):
+        st.markdown(_older_history_markdown(_older))
+
+for idx, message in enumerate(
+    st.session_state.messages[-RECENT_BUBBLES:], start=len(_older)
+):
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
-        # Add timestamp for messages (except welcome)
-        if idx > 0 and "timestamp" in message:
-            st.caption(
-                f"🕐 {datetime.fromisoformat(message['timestamp']).strftime('%I:%M %p')}"
-            )
+        # Add timestamp for messages (except welcome), formatted at append time
+        if idx > 0 and "timestamp_display" in message:
+            st.caption(f"🕐 {message['timestamp_display']}")
 
-# Show helpful example prompts if conversation is empty (only welcome message)
-if len(st.session_state.messages) == 1:
+# Show helpful example prompts until the first user message is sent
+if not st.session_state.get("_conversation_started"):
     st.markdown("### 💡 Try These Example Prompts:")
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.markdown(
-            """
-            <div style='background: rgba(99, 102, 241, 0.1); padding: 1rem;
-                        border-radius: 12px; border: 1px solid rgba(99, 102, 241, 0.3);
-                        margin-bottom: 1rem;'>
-                <h4 style='margin: 0 0 0.5rem 0; color: #A5B4FC;'>🐳 Docker</h4>
-                <ul style='margin: 0; padding-left: 1.5rem; color: #9CA3AF;'>
-                    <li>List all running containers</li>
-                    <li>Show me MCP server status</li>
-                    <li>Get logs from the last hour</li>
-                </ul>
-            </div>
-
-            <div style='background: rgba(167, 139, 250, 0.1); padding: 1rem;
-                        border-radius: 12px; border: 1px solid rgba(167, 139, 250, 0.3);'>
-                <h4 style='margin: 0 0 0.5rem 0; color: #C4B5FD;'>📝 Notion</h4>
-                <ul style='margin: 0; padding-left: 1.5rem; color: #9CA3AF;'>
-                    <li>Search my workspace</li>
-                    <li>List all databases</li>
-                    <li>Create a new task page</li>
-                </ul>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    with col2:
-        st.markdown(
-            """
-            <div style='background: rgba(59, 130, 246, 0.1); padding: 1rem;
-                        border-radius: 12px; border: 1px solid rgba(59, 130, 246, 0.3);
-                        margin-bottom: 1rem;'>
-                <h4 style='margin: 0 0 0.5rem 0; color: #93C5FD;'>🔧 System</h4>
-                <ul style='margin: 0; padding-left: 1.5rem; color: #9CA3AF;'>
-                    <li>Check system health</li>
-                    <li>Show available tools</li>
-                    <li>What can you do?</li>
-                </ul>
-            </div>
-
-            <div style='background: rgba(16, 185, 129, 0.1); padding: 1rem;
-                        border-radius: 12px; border: 1px solid rgba(16, 185, 129, 0.3);'>
-                <h4 style='margin: 0 0 0.5rem 0; color: #6EE7B7;'>💬 Natural Language</h4>
-                <ul style='margin: 0; padding-left: 1.5rem; color: #9CA3AF;'>
-                    <li>Find my latest notes</li>
-                    <li>Help me debug a container</li>
-                    <li>Explain how MCP works</li>
-                </ul>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+    st.markdown(_example_prompts_html(), unsafe_allow_html=True)
 
 # Handle suggested prompts from sidebar
 suggested_prompt = None
@@ -932,75 +1233,67 @@ elif user_input := st.chat_input(
     prompt = user_input
 
 if prompt:
-    # Check backend health before sending
-    health = check_backend_health()
-    if health.get("status") == "unreachable":
-        st.error("❌ Backend is not running. Please start the FastAPI server first.")
-        st.info("Run: `./daemon.sh start` in the project directory")
-        st.stop()
+    # No separate health pre-check: send_chat_message's ConnectionError branch
+    # already reports an unreachable backend, without the extra round trip.
 
     # Add user message to session state with timestamp
+    now = datetime.now()
     user_message = {
         "role": "user",
         "content": prompt,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
+        "timestamp_display": f"{now:%I:%M %p}",
     }
     st.session_state.messages.append(user_message)
+    st.session_state._conversation_started = True
+    st.session_state.conversation_stats["user_count"] = (
+        st.session_state.conversation_stats.get("user_count", 0) + 1
+    )
 
     # Display user message
     with st.chat_message("user"):
         st.markdown(prompt)
-        st.caption(f"🕐 {datetime.now().strftime('%I:%M %p')}")
+        st.caption(f"🕐 {user_message['timestamp_display']}")
 
     # Get assistant response
     with st.chat_message("assistant"):
+        # A single caption is the progress hint; the reply replaces it in place
         message_placeholder = st.empty()
-        status_placeholder = st.empty()
+        message_placeholder.caption("⚡ Generating response...")
 
-        # Show thinking indicator with steps
-        with status_placeholder:
-            with st.status("🤔 Processing your request...", expanded=True) as status:
-                st.write("📡 Connecting to backend...")
-                time.sleep(0.3)
-
-                st.write("� Analyzing your message...")
-                time.sleep(0.3)
-
-                # Prepare history (exclude the current prompt)
-                history_for_api = st.session_state.messages[:-1]
-
-                st.write("⚡ Generating response...")
-
-                # Send request to backend
-                start_time = time.time()
-                assistant_reply = send_chat_message(prompt, history_for_api)
-                elapsed_time = time.time() - start_time
-
-                status.update(
-                    label="✅ Response ready!", state="complete", expanded=False
-                )
+        # Send only the prompt; the backend keeps (and bounds) the history
+        start_time = time.time()
+        assistant_reply, reply_tokens = send_chat_message(
+            prompt, st.session_state.get("conversation_id")
+        )
+        elapsed_time = time.time() - start_time
 
-        # Clear status and display the response
-        status_placeholder.empty()
         message_placeholder.markdown(assistant_reply)
 
+        # One clock read for the reply: shared by the caption and the record
+        now = datetime.now()
+        clock = f"{now:%I:%M %p}"
+
         # Show response metrics in columns
         col1, col2, col3 = st.columns(3)
         with col1:
             st.caption(f"⏱️ {elapsed_time:.2f}s")
         with col2:
-            # Estimate tokens (rough: ~4 chars per token)
-            est_tokens = len(assistant_reply) // 4
-            st.caption(f"📊 ~{est_tokens} tokens")
+            # Token count comes from the model API; errors and older backends
+            # don't report one
+            if reply_tokens is not None:
+                st.caption(f"📊 {reply_tokens} tokens")
         with col3:
-            st.caption(f"🕐 {datetime.now().strftime('%I:%M %p')}")
+            st.caption(f"🕐 {clock}")
 
     # Add assistant response to session state with timestamp
     assistant_message = {
         "role": "assistant",
         "content": assistant_reply,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
+        "timestamp_display": clock,
         "response_time": elapsed_time,
+        "tokens": reply_tokens,
     }
     st.session_state.messages.append(assistant_message)
 
@@ -1014,38 +1307,5 @@ if prompt:
 
 st.markdown("---")
 
-# Enhanced footer with metrics
-footer_col1, footer_col2, footer_col3 = st.columns(3)
-
-with footer_col1:
-    st.markdown(
-        """
-        <div style='text-align: center;'>
-            <p style='margin: 0; color: #6b7280; font-size: 0.9rem;'>Powered by</p>
-            <p style='margin: 0; font-weight: 600; color: #1f2933;'>Google Gemini 🧠</p>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-
-with footer_col2:
-    st.markdown(
-        """
-        <div style='text-align: center;'>
-            <p style='margin: 0; color: #6b7280; font-size: 0.9rem;'>Built with</p>
-            <p style='margin: 0; font-weight: 600; color: #1f2933;'>FastAPI ⚡ & Streamlit 🎈</p>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-
-with footer_col3:
-    st.markdown(
-        """
-        <div style='text-align: center;'>
-            <p style='margin: 0; color: #6b7280; font-size: 0.9rem;'>Integrations</p>
-            <p style='margin: 0; font-weight: 600; color: #1f2933;'>Docker 🐳 & Notion 📝</p>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+# Static footer: one element instead of three columns of markdown
+st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
@@ -4,10 +4,71 @@ Test configuration and fixtures
 Provides common test fixtures and configuration for pytest.
 """
 
+import asyncio
+import sys
+
 import pytest
 from unittest.mock import Mock, AsyncMock
-from app.services.docker_service import DockerService
-from app.services.llm_service import LanguageModelService
+
+# Module-level singletons behind the get_*_service factories
+_SINGLETONS = (
+    ("app.services.docker_service", "_docker_service_instance"),
+    ("app.services.llm_service", "_llm_service_instance"),
+    ("app.services.conversation_store", "_conversation_store_instance"),
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_singletons(monkeypatch):
+    """
+    Give each test empty service singletons, restored afterwards.
+
+    A real service built by one test (e.g. a DockerService with a live
+    client) would otherwise be handed to every later caller. Modules that
+    haven't been imported yet are skipped rather than imported here.
+    """
+    for module_name, attribute in _SINGLETONS:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            monkeypatch.setattr(module, attribute, None)
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """
+    One event loop for every async test in the session.
+
+    Overrides pytest-asyncio's per-test loop, so async tests no longer pay
+    for a new loop's setup and teardown each.
+    """
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def _app():
+    """The FastAPI app with its startup event disabled for the session."""
+    from app.main import app
+
+    on_startup = app.router.on_startup
+    app.router.on_startup = []
+    yield app
+    app.router.on_startup = on_startup
+
+
+@pytest.fixture(scope="session")
+def client(_app):
+    """
+    One test client for the whole session, shared by every test module.
+
+    Entering TestClient starts its thread portal and lifespan once; tests
+    reset per-test state through app.dependency_overrides instead.
+    """
+    from fastapi.testclient import TestClient
+
+    with TestClient(_app) as test_client:
+        yield test_client
 
 
 @pytest.fixture
@@ -22,6 +83,9 @@ def mock_docker_client():
 @pytest.fixture
 def docker_service_mock(mock_docker_client):
     """Mock Docker service instance."""
+    # Imported here so collecting tests that never use it skips the import
+    from app.services.docker_service import DockerService
+
     service = Mock(spec=DockerService)
     service.is_healthy.return_value = True
     service.execute_mcp_command.return_value = "Success"
@@ -33,6 +97,9 @@ def docker_service_mock(mock_docker_client):
 @pytest.fixture
 def llm_service_mock():
     """Mock LLM service instance."""
+    # Imported here so collecting tests that never use it skips google.generativeai
+    from app.services.llm_service import LanguageModelService
+
     service = Mock(spec=LanguageModelService)
     service.get_response = AsyncMock(return_value="Test response")
     service.get_simple_response.return_value = "Simple test response"
@@ -4,33 +4,41 @@ Tests for API Endpoints
 Tests the FastAPI endpoints including chat and health check.
 """
 
+import asyncio
+import json
 import pytest
-from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock, MagicMock
-from app.main import app
+from app.config import MAX_CONVERSATION_HISTORY
+from app.main import get_docker_service, get_llm_provider, verify_config
+from app.services.conversation_store import ConversationStore
 
 
-@pytest.fixture
-def client(monkeypatch):
-    """Create test client with mocked services."""
-    # Mock the services to prevent initialization during tests
-    mock_docker = MagicMock()
-    mock_llm = MagicMock()
+def async_returning(*replies):
+    """
+    An AsyncMock that returns one reply, or several in order.
 
-    def mock_get_docker():
-        return mock_docker
+    Always a new mock: copying a shared AsyncMock would also share its
+    recorded calls between tests.
+    """
+    if len(replies) == 1:
+        return AsyncMock(return_value=replies[0])
+    return AsyncMock(side_effect=list(replies))
 
-    def mock_get_llm():
-        return mock_llm
 
-    monkeypatch.setattr("app.main.get_docker_service", mock_get_docker)
-    monkeypatch.setattr("app.main.get_llm_service", mock_get_llm)
+@pytest.fixture(autouse=True)
+def _services(_app):
+    """
+    Mock the services to prevent initialization during tests.
 
-    # Disable startup event
-    app.router.on_startup = []
+    Yields the (docker, llm) mocks that the app's service dependencies return.
+    """
+    mock_docker = MagicMock()
+    mock_llm = MagicMock()
 
-    with TestClient(app) as test_client:
-        yield test_client
+    _app.dependency_overrides[get_docker_service] = lambda: mock_docker
+    _app.dependency_overrides[get_llm_provider] = lambda: lambda: mock_llm
+    yield mock_docker, mock_llm
+    _app.dependency_overrides.clear()
 
 
 class TestAPIEndpoints:
@@ -47,14 +55,14 @@ class TestAPIEndpoints:
         assert "status" in data
         assert data["status"] == "running"
 
-    @patch("app.main.get_docker_service")
-    @patch("app.main.get_llm_service")
-    def test_health_check_healthy(self, mock_llm, mock_docker, client):
+    def test_health_check_healthy(self, _app, client, _services):
         """Test health check when all services are healthy."""
+        docker, _ = _services
         # Setup mocks
-        mock_docker_instance = mock_docker.return_value
-        mock_docker_instance.is_healthy.return_value = True
-        mock_docker_instance.get_container_info.return_value = {
+        config = {"valid": True, "google_api_configured": True}
+        _app.dependency_overrides[verify_config] = lambda: config
+        docker.is_healthy.return_value = True
+        docker.get_container_info.return_value = {
             "gateway": "MCP Gateway",
             "status": "running",
         }
@@ -67,23 +75,18 @@ class TestAPIEndpoints:
         assert data["status"] == "healthy"
         assert data["docker_connected"] is True
 
-    @patch("app.main.get_docker_service")
-    @patch("app.main.get_llm_service")
-    @patch("app.main.verify_config")
-    def test_health_check_partial(self, mock_config, mock_llm, mock_docker, client):
+    def test_health_check_partial(self, _app, client, _services):
         """Test health check with partial availability."""
+        docker, _ = _services
         # Setup mocks
-        mock_docker_instance = mock_docker.return_value
-        mock_docker_instance.is_healthy.return_value = False
-        mock_docker_instance.get_container_info.return_value = {
+        docker.is_healthy.return_value = False
+        docker.get_container_info.return_value = {
             "gateway": "MCP Gateway",
             "status": "disconnected",
         }
 
-        mock_config.return_value = {
-            "valid": True,
-            "google_api_configured": True,
-        }
+        config = {"valid": True, "google_api_configured": True}
+        _app.dependency_overrides[verify_config] = lambda: config
 
         # Make request
         response = client.get("/health")
@@ -92,20 +95,13 @@ class TestAPIEndpoints:
         data = response.json()
         assert data["status"] in ["partial", "unhealthy"]
 
-    @patch("app.main.get_docker_service")
-    @patch("app.main.get_llm_service")
-    def test_chat_endpoint_success(
-        self, mock_llm, mock_docker, client, sample_chat_request
-    ):
+    def test_chat_endpoint_success(self, client, _services, sample_chat_request):
         """Test successful chat interaction."""
+        docker, llm = _services
         # Setup mocks
-        mock_docker_instance = mock_docker.return_value
-        mock_docker_instance.is_healthy.return_value = True
+        docker.is_healthy.return_value = True
 
-        mock_llm_instance = mock_llm.return_value
-        mock_llm_instance.get_response = AsyncMock(
-            return_value="Here are the running containers..."
-        )
+        llm.get_response = async_returning("Here are the running containers...")
 
         # Make request
         response = client.post("/chat", json=sample_chat_request)
@@ -115,15 +111,13 @@ class TestAPIEndpoints:
         assert "reply" in data
         assert len(data["reply"]) > 0
 
-    @patch("app.main.get_docker_service")
-    @patch("app.main.get_llm_service")
     def test_chat_endpoint_docker_unavailable(
-        self, mock_llm, mock_docker, client, sample_chat_request
+        self, client, _services, sample_chat_request
     ):
         """Test chat endpoint when Docker is unavailable."""
+        docker, _ = _services
         # Setup mocks
-        mock_docker_instance = mock_docker.return_value
-        mock_docker_instance.is_healthy.return_value = False
+        docker.is_healthy.return_value = False
 
         # Make request
         response = client.post("/chat", json=sample_chat_request)
@@ -148,3 +142,172 @@ class TestAPIEndpoints:
         response = client.post("/chat", json=invalid_request)
 
         assert response.status_code == 422  # Validation error
+
+    def test_chat_stream_endpoint_success(self, client, _services, sample_chat_request):
+        """Test streaming chat emits status, delta and done frames."""
+        docker, llm = _services
+        docker.is_healthy.return_value = True
+
+        async def stream_response(prompt, history):
+            for text in ("Streamed", " reply"):
+                yield text
+
+        llm.stream_response = stream_response
+
+        response = client.post("/chat/stream", json=sample_chat_request)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "gzip" not in response.headers.get("content-encoding", "")
+        frames = [
+            json.loads(line[6:])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert [frame["type"] for frame in frames] == [
+            "status",
+            "delta",
+            "delta",
+            "done",
+        ]
+        assert frames[1]["text"] + frames[2]["text"] == "Streamed reply"
+
+    def test_chat_stream_endpoint_docker_unavailable(
+        self, client, _services, sample_chat_request
+    ):
+        """Test streaming chat fails fast when Docker is unavailable."""
+        docker, _ = _services
+        docker.is_healthy.return_value = False
+
+        response = client.post("/chat/stream", json=sample_chat_request)
+
+        assert response.status_code == 503
+
+    def test_chat_endpoint_reports_usage(self, client, _services):
+        """Test the reply carries the model's token count and timing."""
+        docker, llm = _services
+        docker.is_healthy.return_value = True
+
+        async def get_response(prompt, history, usage=None):
+            usage["output_tokens"] = 42
+            return "Counted reply"
+
+        llm.get_response = get_response
+
+        response = client.post("/chat", json={"prompt": "Hello"})
+
+        data = response.json()
+        assert data["tokens"] == 42
+        assert isinstance(data["elapsed_ms"], int)
+
+    def test_chat_endpoint_bounds_client_history(self, client, _services):
+        """Test client-sent history is cut to the configured window."""
+        docker, llm = _services
+        docker.is_healthy.return_value = True
+        llm.get_response = async_returning("ok")
+        history = [
+            {"role": "user", "content": f"Message {i}"}
+            for i in range(MAX_CONVERSATION_HISTORY + 5)
+        ]
+
+        client.post("/chat", json={"prompt": "Latest", "history": history})
+
+        sent = llm.get_response.call_args.kwargs["history"]
+        assert sent == history[-MAX_CONVERSATION_HISTORY:]
+
+    def test_chat_websocket_turn(self, client, _services):
+        """Test a websocket turn emits status, delta and done frames."""
+        docker, llm = _services
+        docker.is_healthy.return_value = True
+        llm.get_response = async_returning("Socket reply")
+
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_json({"prompt": "Hello", "turn_id": "t1"})
+            frames = [websocket.receive_json() for _ in range(3)]
+
+        assert [frame["type"] for frame in frames] == ["status", "delta", "done"]
+        assert all(frame["turn_id"] == "t1" for frame in frames)
+        assert frames[1]["text"] == "Socket reply"
+
+    def test_chat_websocket_cancel(self, client, _services):
+        """Test a pending websocket turn can be cancelled by id."""
+        docker, llm = _services
+        docker.is_healthy.return_value = True
+
+        async def never_replies(prompt, history):
+            await asyncio.Event().wait()
+
+        llm.get_response = never_replies
+
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_json({"prompt": "Tail the logs", "turn_id": "t2"})
+            assert websocket.receive_json()["type"] == "status"
+            websocket.send_json({"cancel": "t2"})
+            assert websocket.receive_json() == {"type": "cancelled", "turn_id": "t2"}
+
+    def test_chat_websocket_malformed_frames(self, client, _services):
+        """Test bad frames get error replies and the socket stays usable."""
+        docker, llm = _services
+        docker.is_healthy.return_value = True
+        llm.get_response = async_returning("Still here")
+
+        with client.websocket_connect("/ws/chat") as websocket:
+            websocket.send_text("not json")
+            assert websocket.receive_json()["type"] == "error"
+            websocket.send_json(["a", "list"])
+            assert websocket.receive_json() == {
+                "type": "error",
+                "text": "Expected a JSON object",
+            }
+            websocket.send_json({"cancel": []})  # Unhashable turn id
+            assert websocket.receive_json() == {
+                "type": "error",
+                "text": "cancel must be a turn_id string",
+            }
+
+            websocket.send_json({"prompt": "Hello", "turn_id": "t3"})
+            frames = [websocket.receive_json() for _ in range(3)]
+
+        assert frames[1] == {"type": "delta", "turn_id": "t3", "text": "Still here"}
+
+    @patch("app.main.get_conversation_store")
+    def test_chat_endpoint_session_history(self, mock_store, client, _services):
+        """Test session requests use and extend server-side history."""
+        docker, llm = _services
+        store = ConversationStore()
+        mock_store.return_value = store
+        docker.is_healthy.return_value = True
+        llm.get_response = async_returning("First", "Second")
+
+        client.post("/chat", json={"prompt": "One", "session_id": "abc"})
+        response = client.post(
+            "/chat",
+            json={"prompt": "Two", "session_id": "abc", "history": [{"x": 1}]},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["session_id"] == "abc"
+        second_call = llm.get_response.call_args_list[1]
+        assert second_call.kwargs["history"] == [
+            {"role": "user", "content": "One"},
+            {"role": "assistant", "content": "First"},
+        ]
+        assert len(store.get_history("abc")) == 4
+
+    @patch("app.main.get_conversation_store")
+    def test_chat_endpoint_assigns_session_id(self, mock_store, client, _services):
+        """Test a first turn without history opens a server-side session."""
+        docker, llm = _services
+        store = ConversationStore()
+        mock_store.return_value = store
+        docker.is_healthy.return_value = True
+        llm.get_response = async_returning("Hi there")
+
+        response = client.post("/chat", json={"prompt": "Hello"})
+
+        session_id = response.json()["session_id"]
+        assert session_id
+        assert store.get_history(session_id) == [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi there"},
+        ]
@@ -0,0 +1,58 @@
+"""
+Tests for Conversation Store
+
+Tests server-side session history retention and bounds.
+"""
+
+from app.services.conversation_store import ConversationStore
+
+
+class TestConversationStore:
+    """Test suite for the in-memory conversation store."""
+
+    def test_unknown_session_is_empty(self):
+        """Test an unseen session has no history."""
+        store = ConversationStore()
+
+        assert store.get_history("missing") == []
+
+    def test_append_and_get_history(self):
+        """Test messages come back in order and as a copy."""
+        store = ConversationStore()
+        store.append("s1", "user", "Hello")
+        store.append("s1", "assistant", "Hi!")
+
+        history = store.get_history("s1")
+        history.append({"role": "user", "content": "not stored"})
+
+        assert store.get_history("s1") == [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi!"},
+        ]
+
+    def test_history_is_bounded(self):
+        """Test only the newest max_messages are kept."""
+        store = ConversationStore(max_messages=2)
+        for i in range(5):
+            store.append("s1", "user", f"msg {i}")
+
+        assert [m["content"] for m in store.get_history("s1")] == ["msg 3", "msg 4"]
+
+    def test_least_recent_session_evicted(self):
+        """Test sessions beyond max_sessions evict the least recently used."""
+        store = ConversationStore(max_sessions=2)
+        store.append("a", "user", "1")
+        store.append("b", "user", "2")
+        store.get_history("a")  # touch "a" so "b" is now the oldest
+        store.append("c", "user", "3")
+
+        assert store.get_history("b") == []
+        assert store.get_history("a") != []
+
+    def test_clear(self):
+        """Test clearing a session forgets its history."""
+        store = ConversationStore()
+        store.append("s1", "user", "Hello")
+        store.clear("s1")
+
+        assert store.get_history("s1") == []
@@ -5,10 +5,13 @@ Tests the Docker service layer including MCP command execution,
 container listing, and error handling.
 """
 
+import asyncio
+import threading
+import time
 import pytest
 from unittest.mock import Mock, patch
 import subprocess
-from app.services.docker_service import DockerService
+from app.services.docker_service import DockerService, _split_command
 from app.exceptions import DockerCommandError, DockerTimeoutError
 
 
@@ -44,17 +47,15 @@ class TestDockerService:
         mock_subprocess.return_value.stderr = ""
 
         # Create service with mocked client
-        with patch("app.services.docker_service.docker.from_env"):
-            service = DockerService.__new__(DockerService)
-            service.client = Mock()
+        service = DockerService.for_testing(Mock())
 
-            # Execute command
-            result = service.execute_mcp_command("server list")
+        # Execute command
+        result = service.execute_mcp_command("server list")
 
-            # Assertions
-            assert "notion" in result
-            assert "github" in result
-            mock_subprocess.assert_called_once()
+        # Assertions
+        assert "notion" in result
+        assert "github" in result
+        mock_subprocess.assert_called_once()
 
     @patch("app.services.docker_service.subprocess.run")
     def test_execute_mcp_command_failure(self, mock_subprocess):
@@ -65,15 +66,13 @@ class TestDockerService:
         mock_subprocess.return_value.stderr = "Command not found"
 
         # Create service
-        with patch("app.services.docker_service.docker.from_env"):
-            service = DockerService.__new__(DockerService)
-            service.client = Mock()
+        service = DockerService.for_testing(Mock())
 
-            # Execute command and expect exception
-            with pytest.raises(DockerCommandError) as exc_info:
-                service.execute_mcp_command("invalid command")
+        # Execute command and expect exception
+        with pytest.raises(DockerCommandError) as exc_info:
+            service.execute_mcp_command("invalid command")
 
-            assert "Command not found" in str(exc_info.value)
+        assert "Command not found" in str(exc_info.value)
 
     @patch("app.services.docker_service.subprocess.run")
     def test_execute_mcp_command_timeout(self, mock_subprocess):
@@ -82,15 +81,13 @@ class TestDockerService:
         mock_subprocess.side_effect = subprocess.TimeoutExpired("docker", 30)
 
         # Create service
-        with patch("app.services.docker_service.docker.from_env"):
-            service = DockerService.__new__(DockerService)
-            service.client = Mock()
+        service = DockerService.for_testing(Mock())
 
-            # Execute command and expect timeout exception
-            with pytest.raises(DockerTimeoutError) as exc_info:
-                service.execute_mcp_command("slow command")
+        # Execute command and expect timeout exception
+        with pytest.raises(DockerTimeoutError) as exc_info:
+            service.execute_mcp_command("slow command")
 
-            assert "30" in str(exc_info.value)
+        assert "30" in str(exc_info.value)
 
     def test_list_containers(self, mock_docker_client):
         """Test listing containers."""
@@ -98,41 +95,80 @@ class TestDockerService:
         container1 = Mock()
         container1.name = "test-container"
         container1.status = "running"
-        container1.image.tags = ["test:latest"]
-        container1.short_id = "abc123"
+        container1.attrs = {"Config": {"Image": "test:latest"}}
 
         mock_docker_client.containers.list.return_value = [container1]
 
         # Create service
-        with patch(
-            "app.services.docker_service.docker.from_env",
-            return_value=mock_docker_client,
-        ):
-            service = DockerService.__new__(DockerService)
-            service.client = mock_docker_client
+        service = DockerService.for_testing(mock_docker_client)
 
-            # List containers
-            result = service.list_containers()
+        # List containers
+        result = service.list_containers()
 
-            # Assertions
-            assert "test-container" in result
-            assert "running" in result
-            mock_docker_client.containers.list.assert_called_once()
+        # Assertions
+        assert "test-container" in result
+        assert "running" in result
+        assert "Image: test:latest" in result
+        mock_docker_client.containers.list.assert_called_once()
 
     def test_list_containers_empty(self, mock_docker_client):
         """Test listing containers when none exist."""
         mock_docker_client.containers.list.return_value = []
 
         # Create service
-        with patch(
-            "app.services.docker_service.docker.from_env",
-            return_value=mock_docker_client,
-        ):
-            service = DockerService.__new__(DockerService)
-            service.client = mock_docker_client
-
-            # List containers
-            result = service.list_containers()
-
-            # Assertions
-            assert "No containers found" in result
+        service = DockerService.for_testing(mock_docker_client)
+
+        # List containers
+        result = service.list_containers()
+
+        # Assertions
+        assert "No containers found" in result
+
+    def test_is_healthy_reuses_recent_probe(self, mock_docker_client):
+        """Test repeated health checks within the TTL ping the daemon once."""
+        service = DockerService.for_testing(mock_docker_client)
+
+        assert service.is_healthy() is True
+        assert service.is_healthy() is True
+        mock_docker_client.ping.assert_called_once()
+
+    @patch("app.services.docker_service.subprocess.run")
+    def test_execute_mcp_command_reuses_parsed_command(self, mock_subprocess):
+        """Test repeated commands are tokenized once and quoting is kept."""
+        mock_subprocess.return_value.returncode = 0
+        mock_subprocess.return_value.stdout = "ok"
+        _split_command.cache_clear()
+
+        service = DockerService.for_testing(Mock())
+        service.execute_mcp_command('tools call search "two words"')
+        service.execute_mcp_command('tools call search "two words"')
+
+        assert _split_command.cache_info().hits == 1
+        args = mock_subprocess.call_args.args[0]
+        assert args == ["docker", "mcp", "tools", "call", "search", "two words"]
+
+    @pytest.mark.asyncio
+    async def test_aexecute_mcp_command_bounds_concurrency(self, monkeypatch):
+        """Test concurrent async commands never run more than 8 processes."""
+        lock = threading.Lock()
+        live = peak = 0
+
+        def fake_run(*args, **kwargs):
+            nonlocal live, peak
+            with lock:
+                live += 1
+                peak = max(peak, live)
+            time.sleep(0.02)
+            with lock:
+                live -= 1
+            return Mock(returncode=0, stdout="ok", stderr="")
+
+        monkeypatch.setattr("app.services.docker_service.subprocess.run", fake_run)
+        service = DockerService.for_testing(Mock())
+
+        results = await asyncio.gather(
+            *(service.aexecute_mcp_command("server list") for _ in range(20))
+        )
+
+        assert results == ["ok"] * 20
+        assert peak == 8
@@ -9,56 +9,153 @@ Comprehensive tests for the LLM service including:
 - Error handling
 """
 
+import copy
+from types import SimpleNamespace
 import pytest
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import DEFAULT, Mock, AsyncMock, MagicMock, call, patch
+import app.services.llm_service as llm_module
+from app.services.docker_service import DockerService
 from app.services.llm_service import LanguageModelService, get_llm_service
 from app.exceptions import LLMConfigurationError, DockerCommandError
 
+# Keeps this module on one pytest-xdist worker under --dist loadgroup, so the
+# session-scoped template service is built once rather than once per worker
+pytestmark = pytest.mark.xdist_group("llm_service")
+
+# Tools the Docker workflows depend on; the model may declare more
+EXPECTED_TOOLS = {"execute_command", "list_containers", "get_logs"}
+
+# A failed MCP command, built once; the dispatcher only reads its message
+_DOCKER_ERR = DockerCommandError("server list", "Connection failed", 1)
+
+
+@pytest.fixture(autouse=True)
+def patched_llm(monkeypatch):
+    """
+    Patch the Gemini client and Docker service for every test in this module.
+
+    One monkeypatch pass per test replaces the four stacked @patch decorators
+    each test used to carry. Tests reach the stand-ins through the returned
+    namespace: configure, model_class (genai.GenerativeModel), the
+    model_instance every model_class() call returns, and docker.
+    """
+    mock_configure = Mock()
+    model_instance = Mock(spec=["generate_content", "start_chat"])
+    mock_model_class = Mock(return_value=model_instance)
+    # Specced so a misspelled Docker method fails, and async methods such as
+    # aexecute_mcp_command come back as AsyncMocks; a copy of one shared
+    # autospec would share its child mocks (and their return values)
+    mock_docker = Mock(spec=DockerService)
+    monkeypatch.setattr(llm_module, "GOOGLE_API_KEY", "test-api-key")
+    monkeypatch.setattr(llm_module.genai, "configure", mock_configure)
+    monkeypatch.setattr(llm_module.genai, "GenerativeModel", mock_model_class)
+    monkeypatch.setattr(llm_module, "get_docker_service", lambda: mock_docker)
+    return SimpleNamespace(
+        configure=mock_configure,
+        model_class=mock_model_class,
+        model_instance=model_instance,
+        docker=mock_docker,
+    )
+
+
+@pytest.fixture(scope="session")
+def _template_service():
+    """One LanguageModelService built for the session under patched clients."""
+    # One patch.multiple per target module; the service is built once, so no
+    # test needs these mocks back
+    with patch.multiple(
+        llm_module, GOOGLE_API_KEY="test-api-key", get_docker_service=DEFAULT
+    ), patch.multiple(llm_module.genai, configure=DEFAULT, GenerativeModel=DEFAULT):
+        return LanguageModelService()
+
+
+@pytest.fixture
+def service(_template_service, patched_llm):
+    """
+    A shallow copy of the template service, wired to this test's stand-ins.
+
+    Copying skips re-running __init__ (genai.configure, the tool declarations)
+    per test. The fallback list is copied too, since switching models pops
+    from it in place.
+    """
+    service = copy.copy(_template_service)
+    service.available_fallbacks = list(_template_service.available_fallbacks)
+    service.model = patched_llm.model_instance
+    service.docker_service = patched_llm.docker
+    return service
+
+
+@pytest.fixture(scope="session")
+def api_history():
+    """A short API-format conversation, shared read-only across tests."""
+    return [
+        {"role": "user", "content": "Hello"},
+        {"role": "assistant", "content": "Hi there!"},
+        {"role": "user", "content": "How are you?"},
+    ]
+
+
+@pytest.fixture(scope="session")
+def long_api_history():
+    """A 1000-message alternating conversation, built once per session."""
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i}"}
+        for i in range(1000)
+    ]
+
+
+def _response(text=None, function_call=None):
+    """
+    A Gemini response whose only part carries function_call (None for text).
+
+    Built fresh per call: copy.copy of a shared template Mock would share its
+    candidates child, so one test's function_call would leak into the next.
+    """
+    part = Mock(function_call=function_call)
+    return Mock(text=text, candidates=[Mock(content=Mock(parts=[part]))])
+
+
+def _send_replies(*replies):
+    """
+    A plain async send_message_async that answers with replies in order.
+
+    A reply that is an exception instance is raised instead. Each call's
+    (message, kwargs) is appended to the returned function's calls list.
+    """
+    remaining = iter(replies)
+    calls = []
+
+    async def send_message_async(message, **kwargs):
+        calls.append((message, kwargs))
+        reply = next(remaining)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    send_message_async.calls = calls
+    return send_message_async
+
+
+def _chat(*replies):
+    """A chat session whose send_message_async answers with replies in order."""
+    return SimpleNamespace(send_message_async=_send_replies(*replies))
+
 
 class TestLLMServiceInitialization:
     """Test suite for LLM service initialization."""
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_init_success(self, mock_docker, mock_model, mock_configure):
-        """Test successful initialization with valid API key."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
+    def test_init_success(self, patched_llm):
+        """Test initialization configures the client, model and tools."""
         # Initialize service
         service = LanguageModelService()
 
         # Assertions
         assert service.current_model_name == "gemini-2.5-flash"
         assert len(service.available_fallbacks) > 0
-        mock_configure.assert_called_once_with(
+        patched_llm.configure.assert_called_once_with(
             api_key="test-api-key"  # pragma: allowlist secret
         )
-        mock_model.assert_called_once()
-
-    @patch("app.services.llm_service.GOOGLE_API_KEY", None)
-    def test_init_no_api_key(self):
-        """Test initialization fails without API key."""
-        with pytest.raises(LLMConfigurationError) as exc_info:
-            LanguageModelService()
-
-        assert "API key not configured" in str(exc_info.value)
-
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_tool_declarations(self, mock_docker, mock_model, mock_configure):
-        """Test that tools are properly declared."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
-        # Initialize service
-        service = LanguageModelService()
+        patched_llm.model_class.assert_called_once()
 
         # Check tools
         assert service.tools is not None
@@ -66,99 +163,95 @@ class TestLLMServiceInitialization:
         assert "function_declarations" in service.tools[0]
 
         # Check function names
-        function_names = [f["name"] for f in service.tools[0]["function_declarations"]]
-        assert "execute_command" in function_names
-        assert "list_containers" in function_names
-        assert "get_logs" in function_names
+        function_names = {f["name"] for f in service.tools[0]["function_declarations"]}
+        assert EXPECTED_TOOLS <= function_names
 
+    def test_init_no_api_key(self, monkeypatch):
+        """Test initialization fails without API key."""
+        monkeypatch.setattr(llm_module, "GOOGLE_API_KEY", None)
 
-class TestFunctionExecution:
-    """Test suite for function call execution."""
+        with pytest.raises(LLMConfigurationError) as exc_info:
+            LanguageModelService()
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_execute_command_function(self, mock_docker, mock_model, mock_configure):
-        """Test execute_command function call."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker_instance.execute_mcp_command.return_value = (
-            "Command executed successfully"
-        )
-        mock_docker.return_value = mock_docker_instance
+        assert "API key is missing" in str(exc_info.value)
 
-        # Initialize service
-        service = LanguageModelService()
 
-        # Execute function
-        result = service._execute_function_call(
-            "execute_command", {"command": "server list"}
-        )
+class TestFunctionExecution:
+    """Test suite for function call execution."""
 
-        # Assertions
-        assert "successfully" in result
-        mock_docker_instance.execute_mcp_command.assert_called_once_with("server list")
-
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_list_containers_function(self, mock_docker, mock_model, mock_configure):
-        """Test list_containers function call."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker_instance.list_containers.return_value = (
-            "Container1: running\nContainer2: stopped"
+    @pytest.mark.parametrize(
+        "function_name,docker_method,args,docker_result,expected_call",
+        [
+            (
+                "execute_command",
+                "execute_mcp_command",
+                {"command": "server list"},
+                "Command executed successfully",
+                call("server list"),
+            ),
+            (
+                "list_containers",
+                "list_containers",
+                {},
+                "Container1: running\nContainer2: stopped",
+                call(),
+            ),
+            (
+                "get_logs",
+                "get_logs",
+                {"container_name": "mcp-gateway"},
+                "Log line 1\nLog line 2",
+                call(container_name="mcp-gateway", tail=50),
+            ),
+        ],
+    )
+    def test_function_dispatch(
+        self,
+        service,
+        patched_llm,
+        function_name,
+        docker_method,
+        args,
+        docker_result,
+        expected_call,
+    ):
+        """Test each Docker tool call reaches its service method and result."""
+        method = getattr(patched_llm.docker, docker_method)
+        method.return_value = docker_result
+
+        result = service._execute_function_call(function_name, args)
+
+        assert result == docker_result
+        assert method.call_args_list == [expected_call]
+
+    @pytest.mark.parametrize(
+        "args,expected_tail",
+        [
+            ({}, 50),  # Default tail
+            ({"tail": 100}, 100),  # Custom tail
+        ],
+    )
+    def test_get_logs_tail(self, service, patched_llm, args, expected_tail):
+        """Test get_logs passes the requested tail, defaulting to 50 lines."""
+        patched_llm.docker.get_logs.return_value = "Log line 1"
+
+        service._execute_function_call(
+            "get_logs", {"container_name": "mcp-gateway", **args}
         )
-        mock_docker.return_value = mock_docker_instance
-
-        # Initialize service
-        service = LanguageModelService()
 
-        # Execute function
-        result = service._execute_function_call("list_containers", {})
-
-        # Assertions
-        assert "Container1" in result
-        mock_docker_instance.list_containers.assert_called_once()
-
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_get_logs_function(self, mock_docker, mock_model, mock_configure):
-        """Test get_logs function call."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker_instance.get_logs.return_value = "Log line 1\nLog line 2"
-        mock_docker.return_value = mock_docker_instance
-
-        # Initialize service
-        service = LanguageModelService()
+        patched_llm.docker.get_logs.assert_called_once_with(
+            container_name="mcp-gateway", tail=expected_tail
+        )
 
-        # Execute function with default tail
+    def test_get_logs_requires_container_name(self, service, patched_llm):
+        """Test get_logs without a container name errors before reaching Docker."""
         result = service._execute_function_call("get_logs", {})
-        assert "Log line 1" in result
-        mock_docker_instance.get_logs.assert_called_with(tail=50)
-
-        # Execute function with custom tail
-        result = service._execute_function_call("get_logs", {"tail": 100})
-        mock_docker_instance.get_logs.assert_called_with(tail=100)
-
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_unknown_function(self, mock_docker, mock_model, mock_configure):
-        """Test handling of unknown function call."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
 
-        # Initialize service
-        service = LanguageModelService()
+        assert "container_name" in result
+        patched_llm.docker.get_logs.assert_not_called()
 
+    def test_unknown_function(self, service):
+        """Test handling of unknown function call."""
         # Execute unknown function
         result = service._execute_function_call("unknown_function", {})
 
@@ -166,21 +259,11 @@ class TestFunctionExecution:
         assert "Error" in result
         assert "unknown_function" in result
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_function_docker_error(self, mock_docker, mock_model, mock_configure):
+    def test_function_docker_error(self, service, patched_llm):
         """Test handling of Docker errors in function calls."""
         # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker_instance.execute_mcp_command.side_effect = DockerCommandError(
-            "server list", "Connection failed", 1
-        )
-        mock_docker.return_value = mock_docker_instance
-
-        # Initialize service
-        service = LanguageModelService()
+        mock_docker_instance = patched_llm.docker
+        mock_docker_instance.execute_mcp_command.side_effect = _DOCKER_ERR
 
         # Execute function that raises error
         result = service._execute_function_call(
@@ -191,19 +274,9 @@ class TestFunctionExecution:
         assert "Error" in result
         assert "Connection failed" in result
 
-    @patch("app.services.llm_service.NOTION_TOKEN", "test-token")
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_notion_api_call_unescapes_apostrophes(
-        self, mock_docker, mock_model, mock_configure
-    ):
+    def test_notion_api_call_unescapes_apostrophes(self, service, monkeypatch):
         """Ensure notion_api_call handles stray escaped apostrophes."""
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
-        service = LanguageModelService()
+        monkeypatch.setattr(llm_module, "NOTION_TOKEN", "test-token")
 
         body = """{"properties": {"Description": {"rich_text": [{"text": {"content": "We\\'re excited"}}]}}}"""
 
@@ -227,120 +300,106 @@ class TestFunctionExecution:
 class TestResponseGeneration:
     """Test suite for response generation with agentic loop."""
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
     @pytest.mark.asyncio
-    async def test_get_response_no_tool_use(
-        self, mock_docker, mock_model_class, mock_configure
-    ):
+    async def test_get_response_no_tool_use(self, service, patched_llm):
         """Test response generation without tool use."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
         # Create mock response without function call
-        mock_response = Mock()
-        mock_response.text = "Hello! How can I help you?"
-        mock_response.candidates = [Mock()]
-        mock_response.candidates[0].content.parts = [Mock()]
-        mock_response.candidates[0].content.parts[0].function_call = None
-
-        # Mock chat
-        mock_chat = Mock()
-        mock_chat.send_message_async = AsyncMock(return_value=mock_response)
+        mock_response = _response("Hello! How can I help you?")
 
-        # Mock model
-        mock_model = Mock()
-        mock_model.start_chat.return_value = mock_chat
-        mock_model_class.return_value = mock_model
-
-        # Initialize service
-        service = LanguageModelService()
+        mock_chat = _chat(mock_response)
+        patched_llm.model_instance.start_chat.return_value = mock_chat
 
         # Get response
         response = await service.get_response("Hello", [])
 
         # Assertions
         assert "Hello" in response
-        mock_chat.send_message_async.assert_called()
+        assert len(mock_chat.send_message_async.calls) == 1
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
     @pytest.mark.asyncio
-    async def test_get_response_with_tool_use(
-        self, mock_docker, mock_model_class, mock_configure
-    ):
+    async def test_get_response_with_tool_use(self, service, patched_llm):
         """Test response generation with tool use."""
         # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker_instance.execute_mcp_command.return_value = "notion github"
-        mock_docker.return_value = mock_docker_instance
+        mock_docker_instance = patched_llm.docker
+        mock_docker_instance.aexecute_mcp_command.return_value = "notion github"
 
         # Create mock function call response
         mock_function_call = Mock()
         mock_function_call.name = "execute_command"
         mock_function_call.args = {"command": "server list"}
 
-        mock_response_with_call = Mock()
-        mock_response_with_call.candidates = [Mock()]
-        mock_response_with_call.candidates[0].content.parts = [Mock()]
-        mock_response_with_call.candidates[0].content.parts[
-            0
-        ].function_call = mock_function_call
+        mock_response_with_call = _response(function_call=mock_function_call)
 
         # Create mock final response
-        mock_final_response = Mock()
-        mock_final_response.text = "The available servers are: notion and github"
-        mock_final_response.candidates = [Mock()]
-        mock_final_response.candidates[0].content.parts = [Mock()]
-        mock_final_response.candidates[0].content.parts[0].function_call = None
-
-        # Mock chat
-        mock_chat = Mock()
-        mock_chat.send_message_async = AsyncMock(
-            side_effect=[mock_response_with_call, mock_final_response]
-        )
-
-        # Mock model
-        mock_model = Mock()
-        mock_model.start_chat.return_value = mock_chat
-        mock_model_class.return_value = mock_model
+        mock_final_response = _response("The available servers are: notion and github")
 
-        # Initialize service
-        service = LanguageModelService()
+        mock_chat = _chat(mock_response_with_call, mock_final_response)
+        patched_llm.model_instance.start_chat.return_value = mock_chat
 
         # Get response
         response = await service.get_response("List servers", [])
 
         # Assertions
         assert "servers" in response.lower()
-        assert mock_chat.send_message_async.call_count == 2
+        assert len(mock_chat.send_message_async.calls) == 2
+        mock_docker_instance.aexecute_mcp_command.assert_awaited_once_with(
+            "server list"
+        )
+
+    @pytest.mark.asyncio
+    async def test_stream_response_yields_chunks(self, service, patched_llm):
+        """Test streaming yields the model's text chunks in order."""
+        # Streamed response: first chunk is text, so the answer streams directly
+        mock_stream = MagicMock()
+        mock_stream.candidates = [Mock()]
+        mock_stream.candidates[0].content.parts = [Mock(function_call=None)]
+        mock_stream.__aiter__.return_value = [
+            Mock(parts=[Mock()], text="Hello"),
+            Mock(parts=[Mock()], text=" there"),
+        ]
+
+        mock_chat = _chat(mock_stream)
+        patched_llm.model_instance.start_chat.return_value = mock_chat
+
+        chunks = [chunk async for chunk in service.stream_response("Hi", [])]
+
+        assert chunks == ["Hello", " there"]
+        [(_, kwargs)] = mock_chat.send_message_async.calls
+        assert kwargs["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_stream_response_does_not_replay_tools(self, service, patched_llm):
+        """Test a failure after a tool ran is raised, not retried unstreamed."""
+        mock_docker_instance = patched_llm.docker
+        mock_docker_instance.aexecute_mcp_command.return_value = "ok"
+
+        # First streamed response is a function call; the follow-up fails
+        mock_function_call = Mock()
+        mock_function_call.name = "execute_command"
+        mock_function_call.args = {"command": "server list"}
+        mock_call_stream = _response(function_call=mock_function_call)
+        mock_call_stream.resolve = AsyncMock()
+
+        patched_llm.model_instance.start_chat.return_value = _chat(
+            mock_call_stream, Exception("429 Resource exhausted")
+        )
+
+        service.get_response = AsyncMock()
+
+        with pytest.raises(Exception, match="429"):
+            _ = [chunk async for chunk in service.stream_response("Hi", [])]
+
+        mock_docker_instance.aexecute_mcp_command.assert_awaited_once_with(
+            "server list"
+        )
+        service.get_response.assert_not_called()
 
 
 class TestRateLimitFallback:
     """Test suite for rate limit handling and model fallback."""
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_switch_to_fallback_model(
-        self, mock_docker, mock_model_class, mock_configure
-    ):
+    def test_switch_to_fallback_model(self, service):
         """Test switching to fallback model on rate limit."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
-        mock_model = Mock()
-        mock_model_class.return_value = mock_model
-
-        # Initialize service
-        service = LanguageModelService()
         initial_model = service.current_model_name
         initial_fallbacks = len(service.available_fallbacks)
 
@@ -352,23 +411,8 @@ class TestRateLimitFallback:
         assert service.current_model_name != initial_model
         assert len(service.available_fallbacks) == initial_fallbacks - 1
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_switch_no_fallbacks_remaining(
-        self, mock_docker, mock_model_class, mock_configure
-    ):
+    def test_switch_no_fallbacks_remaining(self, service):
         """Test fallback when no models remaining."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
-        mock_model = Mock()
-        mock_model_class.return_value = mock_model
-
-        # Initialize service
-        service = LanguageModelService()
         service.available_fallbacks = []  # No fallbacks left
 
         # Try to switch
@@ -377,51 +421,17 @@ class TestRateLimitFallback:
         # Assertions
         assert result is False
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
     @pytest.mark.asyncio
-    async def test_get_response_rate_limit_retry(
-        self, mock_docker, mock_model_class, mock_configure
-    ):
+    async def test_get_response_rate_limit_retry(self, service, patched_llm):
         """Test automatic retry with fallback on rate limit."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
         # Create mock response
-        mock_response = Mock()
-        mock_response.text = "Success after fallback"
-        mock_response.candidates = [Mock()]
-        mock_response.candidates[0].content.parts = [Mock()]
-        mock_response.candidates[0].content.parts[0].function_call = None
-
-        # Mock chat that fails first time then succeeds
-        mock_chat_fail = Mock()
-        mock_chat_fail.send_message_async = AsyncMock(
-            side_effect=Exception("429 rate limit exceeded")
-        )
+        mock_response = _response("Success after fallback")
 
-        mock_chat_success = Mock()
-        mock_chat_success.send_message_async = AsyncMock(return_value=mock_response)
-
-        # Mock model
-        mock_model = Mock()
-        call_count = [0]
-
-        def start_chat_side_effect(*args, **kwargs):
-            call_count[0] += 1
-            if call_count[0] == 1:
-                return mock_chat_fail
-            else:
-                return mock_chat_success
-
-        mock_model.start_chat.side_effect = start_chat_side_effect
-        mock_model_class.return_value = mock_model
-
-        # Initialize service
-        service = LanguageModelService()
+        # Chat that fails first time, then the fallback model's chat succeeds
+        patched_llm.model_instance.start_chat.side_effect = [
+            _chat(Exception("429 rate limit exceeded")),
+            _chat(mock_response),
+        ]
 
         # Get response (should retry with fallback)
         response = await service.get_response("Test prompt", [])
@@ -433,26 +443,8 @@ class TestRateLimitFallback:
 class TestHistoryConversion:
     """Test suite for conversation history conversion."""
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_convert_history(self, mock_docker, mock_model, mock_configure):
+    def test_convert_history(self, service, api_history):
         """Test conversion of API history to Gemini format."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
-        # Initialize service
-        service = LanguageModelService()
-
-        # Convert history
-        api_history = [
-            {"role": "user", "content": "Hello"},
-            {"role": "assistant", "content": "Hi there!"},
-            {"role": "user", "content": "How are you?"},
-        ]
-
         gemini_history = service._convert_history(api_history)
 
         # Assertions
@@ -462,57 +454,35 @@ class TestHistoryConversion:
         assert gemini_history[2]["role"] == "user"
         assert gemini_history[0]["parts"][0]["text"] == "Hello"
 
+    def test_convert_long_history(self, service, long_api_history):
+        """Test a long conversation converts message for message, in order."""
+        gemini_history = service._convert_history(long_api_history)
+
+        assert len(gemini_history) == len(long_api_history)
+        assert [m["role"] for m in gemini_history[:4]] == ["user", "model"] * 2
+        assert gemini_history[-1]["parts"][0]["text"] == "Message 999"
+
 
 class TestSimpleResponse:
     """Test suite for simple response generation."""
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_get_simple_response_success(
-        self, mock_docker, mock_model_class, mock_configure
-    ):
+    def test_get_simple_response_success(self, service, patched_llm):
         """Test simple response generation."""
         # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
-        mock_response = Mock()
-        mock_response.text = "Simple response"
-
-        mock_model = Mock()
-        mock_model.generate_content.return_value = mock_response
-        mock_model_class.return_value = mock_model
-
-        # Initialize service
-        service = LanguageModelService()
+        model = patched_llm.model_instance
+        model.generate_content.return_value = SimpleNamespace(text="Simple response")
 
         # Get simple response
         response = service.get_simple_response("Simple question")
 
         # Assertions
         assert response == "Simple response"
-        mock_model.generate_content.assert_called_once_with("Simple question")
-
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_get_simple_response_error(
-        self, mock_docker, mock_model_class, mock_configure
-    ):
+        model.generate_content.assert_called_once_with("Simple question")
+
+    def test_get_simple_response_error(self, service, patched_llm):
         """Test simple response with error."""
         # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
-        mock_model = Mock()
-        mock_model.generate_content.side_effect = Exception("API error")
-        mock_model_class.return_value = mock_model
-
-        # Initialize service
-        service = LanguageModelService()
+        patched_llm.model_instance.generate_content.side_effect = Exception("API error")
 
         # Get simple response
         response = service.get_simple_response("Question")
@@ -525,24 +495,13 @@ class TestSimpleResponse:
 class TestServiceSingleton:
     """Test suite for singleton pattern."""
 
-    @patch("app.services.llm_service.GOOGLE_API_KEY", "test-api-key")
-    @patch("app.services.llm_service.genai.configure")
-    @patch("app.services.llm_service.genai.GenerativeModel")
-    @patch("app.services.llm_service.get_docker_service")
-    def test_singleton_pattern(self, mock_docker, mock_model, mock_configure):
-        """Test that get_llm_service returns same instance."""
-        # Setup mocks
-        mock_docker_instance = Mock()
-        mock_docker.return_value = mock_docker_instance
-
-        # Clear any existing instance
-        import app.services.llm_service as llm_module
-
-        llm_module._llm_service_instance = None
-
-        # Get service twice
+    def test_singleton_pattern(self, patched_llm):
+        """Test that get_llm_service builds one instance and keeps returning it."""
+        # conftest's _reset_singletons starts each test with no cached instance
         service1 = get_llm_service()
         service2 = get_llm_service()
 
         # Assertions
         assert service1 is service2  # Same instance
+        assert service2 is llm_module._llm_service_instance  # Cached slot
+        patched_llm.configure.assert_called_once()  # Constructed only once